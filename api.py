@@ -8,8 +8,8 @@ import os
 import json
 import csv
 import time
-import multiprocessing as mp
-from concurrent.futures import ProcessPoolExecutor, as_completed
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from functools import partial
 from loguru import logger
 import sys
@@ -19,12 +19,14 @@ import asyncio
 # 환경 설정 및 로깅 설정
 from config.settings import (
     KIWOOM_APP_KEY, KIWOOM_APP_SECRET,
-    KIS_APP_KEY, KIS_APP_SECRET,
+    KIS_APP_KEY, KIS_APP_SECRET, KIS_CONCURRENCY,
     DATA_PATH
 )
 
 # API 클라이언트 및 토큰 관리
 from api.token_manager import KiwoomTokenManager, KoreaInvestmentTokenManager, TokenFailedException
+from api.base_client import FatalTokenError
+from api.http_session import create_session
 from api.kiwoom_client import KiwoomAPIClient
 from api.korea_investment_client import KoreaInvestmentAPIClient
 from utils.error_handler import APIErrorHandler
@@ -135,7 +137,7 @@ async def get_stock_list():
         logger.info(f"총 {len(all_stocks)}개 종목 정보 가져오기 완료")
         return all_stocks
         
-    except TokenFailedException as e:
+    except (TokenFailedException, FatalTokenError) as e:
         logger.critical(f"치명적 오류: {str(e)}")
         raise HTTPException(status_code=500, detail=f"토큰 발급 실패: {str(e)}")
         
@@ -144,7 +146,53 @@ async def get_stock_list():
         raise HTTPException(status_code=500, detail=f"종목 리스트 가져오기 실패: {str(e)}")
 
 
-# 개별 종목 시세 데이터 수집 함수 (멀티프로세싱용)
+# 시세 수집 최대 동시 요청 수 (공유 세션의 커넥션 풀 크기와 동일하게 유지)
+MAX_PRICE_WORKERS = KIS_CONCURRENCY
+
+# 워커 스레드별로 재사용하는 API 클라이언트와 에러 핸들러 (워커 초기화 시 생성)
+_worker_local = threading.local()
+
+# 모든 워커 스레드가 공유하는 토큰 매니저와 커넥션 풀 세션 (처음 필요할 때 생성)
+# (요청 속도 제한기는 모듈 단위로 공유되므로 스레드 수와 관계없이 전체 호출 한도가 유지됨)
+_shared_lock = threading.Lock()
+_shared_token_manager = None
+_shared_session = None
+
+
+def _get_shared_kis_resources():
+    """워커 스레드가 공유하는 한국투자증권 토큰 매니저와 세션 반환 (없으면 생성)"""
+    global _shared_token_manager, _shared_session
+    with _shared_lock:
+        if _shared_token_manager is None:
+            # 토큰 매니저 생성 - 실패 시 예외 발생
+            _shared_token_manager = KoreaInvestmentTokenManager(KIS_APP_KEY, KIS_APP_SECRET)
+        if _shared_session is None:
+            # 하나의 커넥션 풀에서 keep-alive 커넥션을 스레드 간에 재사용
+            _shared_session = create_session(pool_connections=1, pool_maxsize=MAX_PRICE_WORKERS)
+        return _shared_token_manager, _shared_session
+
+
+def _get_worker_client():
+    """현재 워커 스레드의 API 클라이언트와 에러 핸들러 반환 (없으면 생성)"""
+    client = getattr(_worker_local, 'client', None)
+    if client is None:
+        token_manager, session = _get_shared_kis_resources()
+        client = _worker_local.client = KoreaInvestmentAPIClient(token_manager, session=session)
+        _worker_local.error_handler = APIErrorHandler()
+    return client, _worker_local.error_handler
+
+
+def _init_price_worker():
+    """시세 수집 워커 스레드 초기화 (스레드당 한 번 API 클라이언트 생성)"""
+    try:
+        _get_worker_client()
+    except Exception as e:
+        # 초기화 함수에서 예외가 나면 스레드 풀 전체가 중단되므로,
+        # 여기서는 기록만 하고 첫 작업에서 다시 생성하며 오류를 전파
+        logger.error(f"워커 초기화 실패: {str(e)}")
+
+
+# 개별 종목 시세 데이터 수집 함수 (워커 스레드에서 실행)
 def collect_price_data(stock_data, start_date, end_date):
     """개별 종목의 시세 데이터 수집"""
     stock_code = stock_data.get('code')
@@ -154,14 +202,8 @@ def collect_price_data(stock_data, start_date, end_date):
         return None
     
     try:
-        # 토큰 매니저 생성
-        token_manager = KoreaInvestmentTokenManager(KIS_APP_KEY, KIS_APP_SECRET)
-        
-        # API 클라이언트 생성
-        client = KoreaInvestmentAPIClient(token_manager)
-        
-        # 에러 핸들러 생성
-        error_handler = APIErrorHandler()
+        # 워커 스레드에서 재사용하는 API 클라이언트와 에러 핸들러
+        client, error_handler = _get_worker_client()
         
         # 시세 정보 가져오기
         price_data = error_handler.handle_request(
@@ -189,6 +231,9 @@ def collect_price_data(stock_data, start_date, end_date):
         else:
             return None
             
+    except (TokenFailedException, FatalTokenError):
+        # 토큰 오류는 수집 작업으로 전파하여 전체 작업을 중단
+        raise
     except Exception:
         return None
 
@@ -301,8 +346,8 @@ async def collect_stock_prices(task_id, start_date, end_date, max_stocks=None):
         active_tasks[task_id]["message"] = f"시세 데이터 수집 시작... (총 {len(stock_list)}개 종목)"
         
         # 병렬 처리 설정
-        max_workers = max(1, mp.cpu_count() - 1)  # CPU 코어 수 - 1 (최소 1)
-        logger.info(f"병렬 처리 사용: {max_workers}개 프로세스")
+        max_workers = MAX_PRICE_WORKERS  # 네트워크 대기 위주 작업이므로 CPU 코어 수가 아닌 설정값 사용
+        logger.info(f"병렬 처리 사용: {max_workers}개 스레드")
         
         # 작업 배치 구성 (API 제한 방지)
         batch_size = 20  # 한 번에 처리할 작업 수
@@ -313,17 +358,21 @@ async def collect_stock_prices(task_id, start_date, end_date, max_stocks=None):
         start_time = time.time()
         completed = 0
         
-        # 배치 단위로 처리
-        for batch_idx in range(total_batches):
-            batch_start = batch_idx * batch_size
-            batch_end = min(batch_start + batch_size, len(stock_list))
-            current_batch = stock_list[batch_start:batch_end]
-            
-            # 병렬 처리 준비
-            collect_with_dates = partial(collect_price_data, start_date=start_date, end_date=end_date)
-            
-            # 병렬 실행
-            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        # 병렬 처리 준비
+        collect_with_dates = partial(collect_price_data, start_date=start_date, end_date=end_date)
+        
+        # 워커가 공유할 토큰 매니저를 미리 생성 (토큰 발급/갱신 타이머는 하나만 동작, 실패 시 예외 발생)
+        _get_shared_kis_resources()
+        
+        # 스레드 풀은 전체 배치에 걸쳐 한 번만 생성하여 재사용
+        with ThreadPoolExecutor(max_workers=max_workers, initializer=_init_price_worker) as executor:
+            # 배치 단위로 처리
+            for batch_idx in range(total_batches):
+                batch_start = batch_idx * batch_size
+                batch_end = min(batch_start + batch_size, len(stock_list))
+                current_batch = stock_list[batch_start:batch_end]
+                
+                # 현재 배치 제출 후 완료된 순서대로 수집
                 futures = {executor.submit(collect_with_dates, stock): stock for stock in current_batch}
                 
                 for future in as_completed(futures):
@@ -335,6 +384,8 @@ async def collect_stock_prices(task_id, start_date, end_date, max_stocks=None):
                             success_count += 1
                         else:
                             fail_count += 1
+                    except (TokenFailedException, FatalTokenError):
+                        raise
                     except Exception as e:
                         logger.error(f"종목 {stock.get('code')} 데이터 수집 중 오류: {str(e)}")
                         fail_count += 1
@@ -353,10 +404,10 @@ async def collect_stock_prices(task_id, start_date, end_date, max_stocks=None):
                         f"(성공: {success_count}, 실패: {fail_count}), "
                         f"남은 시간: {estimated_remaining/60:.1f}분"
                     )
-            
-            # 배치 간 대기 (API 제한 방지)
-            if batch_idx < total_batches - 1:
-                await asyncio.sleep(wait_time)  # 배치 사이 대기
+                
+                # 배치 간 대기 (API 제한 방지, 풀은 유지)
+                if batch_idx < total_batches - 1:
+                    await asyncio.sleep(wait_time)  # 배치 사이 대기
         
         total_time = time.time() - start_time
         logger.info(f"시세 데이터 수집 완료: 성공 {success_count}개, 실패 {fail_count}개, 총 {len(all_price_data)}개 데이터")
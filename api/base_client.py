@@ -2,13 +2,17 @@ from abc import ABC, abstractmethod
 from loguru import logger
 import json
 import requests
-import sys
+from api.http_session import create_session
 from api.token_manager import TokenExpiredException, TokenFailedException
+from utils import json_codec
 
 
 class ApiResponse:
     """API 응답을 표준화하는 클래스"""
     
+    # 요청마다 생성되므로 인스턴스 __dict__ 생성 생략
+    __slots__ = ('success', 'data', 'error', 'code', 'message')
+    
     def __init__(self, success=True, data=None, error=None, code=None, message=None):
         self.success = success
         self.data = data or {}
@@ -26,6 +30,10 @@ class ApiResponse:
             'message': self.message
         }
     
+    def to_json(self):
+        """응답을 JSON 바이트로 변환"""
+        return json_codec.dumps(self.to_dict())
+    
     @classmethod
     def success_response(cls, data):
         """성공 응답 생성"""
@@ -40,8 +48,38 @@ class ApiResponse:
 class StockAPIClient(ABC):
     """주식 API 클라이언트 추상 기본 클래스"""
     
-    def __init__(self, token_manager):
+    # 만료까지 남은 시간이 이 값(초)보다 작으면 요청 전에 토큰을 미리 갱신
+    TOKEN_REFRESH_MARGIN = 30
+    
+    def __init__(self, token_manager, session=None):
         self.token_manager = token_manager
+        # 커넥션 재사용을 위한 세션 (keep-alive로 매 요청 TLS 핸드셰이크 방지)
+        # 외부에서 주입된 세션은 여러 클라이언트가 공유하므로 close()에서 닫지 않음
+        self._owns_session = session is None
+        self.session = session if session is not None else create_session()
+        # 토큰별 기본 헤더 캐시 (토큰이 바뀌면 재생성)
+        self._base_headers = None
+        self._base_headers_token = None
+        # 엔드포인트별 전체 URL 캐시
+        self._url_cache = {}
+    
+    def close(self):
+        """세션 종료 (풀링된 커넥션 반환)"""
+        if self._owns_session:
+            self.session.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def _url(self, endpoint):
+        """엔드포인트의 전체 URL 반환 (한 번 만든 URL은 재사용)"""
+        url = self._url_cache.get(endpoint)
+        if url is None:
+            url = self._url_cache[endpoint] = self.base_url + endpoint
+        return url
     
     @abstractmethod
     def get_headers(self):
@@ -49,81 +87,95 @@ class StockAPIClient(ABC):
         pass
     
     def execute_request(self, method, endpoint, params=None, data=None, headers=None):
-        """API 요청 실행"""
+        """API 요청 실행 (ApiResponse 반환)"""
         if headers is None:
             try:
                 headers = self.get_headers()
             except TokenFailedException as e:
-                # 토큰 발급 실패 시 프로그램 종료
-                logger.critical(f"치명적 오류: 토큰 발급 실패 - {str(e)}")
-                sys.exit(1)
+                # 토큰 발급 실패는 호출자에게 전파 (최상위에서 정리 후 종료)
+                raise FatalTokenError(f"토큰 발급 실패 - {str(e)}") from e
+        elif self.token_manager.seconds_until_expiry() < self.TOKEN_REFRESH_MARGIN:
+            # 미리 만들어 둔 헤더의 토큰이 곧 만료되면 401 왕복 없이 먼저 갱신
+            try:
+                headers = {**headers, **self.get_headers()}
+            except TokenFailedException as e:
+                raise FatalTokenError(f"토큰 발급 실패 - {str(e)}") from e
         
-        url = self.base_url + endpoint
-        logger.debug(f"API 요청: {method} {url}")
+        url = self._url(endpoint)
         
-        try:
-            response = requests.request(
-                method=method,
-                url=url,
-                params=params,
-                json=data,
-                headers=headers,
-                timeout=30  # 타임아웃 설정
-            )
-            
-            # 헤더 정보 저장 (연속 조회 등에 필요)
-            response_headers = {}
-            for key, value in response.headers.items():
-                response_headers[key.lower()] = value
-            
-            # 응답 상태 코드 확인
-            if response.status_code == 401:
-                logger.warning("토큰이 만료되었습니다. 토큰을 갱신합니다.")
-                try:
-                    # 토큰 갱신 시도
-                    self.token_manager.refresh_token()
-                    # 새 헤더로 다시 요청
-                    new_headers = self.get_headers()
-                    return self.execute_request(method, endpoint, params, data, new_headers)
-                except TokenFailedException as e:
-                    # 토큰 갱신 실패 시 프로그램 종료
-                    logger.critical(f"치명적 오류: 토큰 갱신 실패 - {str(e)}")
-                    sys.exit(1)
-            
-            if response.status_code != 200:
-                error_msg = f"API 오류: 상태 코드 {response.status_code}"
-                logger.error(f"{error_msg} - {response.text[:200]}")  # 긴 응답은 앞부분만 로깅
-                return self._standardize_response({"error": error_msg}, success=False, 
-                                                code=str(response.status_code))
-            
+        # 요청 본문은 재시도와 관계없이 한 번만 직렬화
+        body = None
+        if data is not None:
+            body = json_codec.dumps(data)
+            if 'Content-Type' not in headers:
+                headers = {**headers, 'Content-Type': 'application/json; charset=UTF-8'}
+        
+        # 401 응답 시 토큰 갱신 후 한 번만 재시도 (재귀 호출 없이 반복문으로 처리)
+        max_attempts = 2
+        for attempt in range(max_attempts):
+            # 디버그 레벨이 꺼져 있으면 메시지 포맷팅을 생략하도록 인자로 전달
+            logger.debug("API 요청: {} {}", method, url)
+                
             try:
-                json_response = response.json()
-                json_response['_response_headers'] = response_headers
+                response = self.session.request(
+                    method=method,
+                    url=url,
+                    params=params,
+                    data=body,
+                    headers=headers,
+                    timeout=(5, 30)  # 타임아웃 설정 (연결, 읽기)
+                )
                 
-                # 디버그 로깅 - API 응답 기본 정보
-                if 'return_code' in json_response:
-                    logger.debug(f"API 응답: 코드 {json_response['return_code']} - {json_response.get('return_msg', '')}")
-                elif 'rt_cd' in json_response:
-                    logger.debug(f"API 응답: 코드 {json_response['rt_cd']} - {json_response.get('msg1', '')}")
+                # 응답 상태 코드 확인
+                if response.status_code == 401 and attempt < max_attempts - 1:
+                    logger.warning("토큰이 만료되었습니다. 토큰을 갱신합니다.")
+                    try:
+                        # 토큰 갱신 시도
+                        self.token_manager.refresh_token()
+                        # 요청별 헤더(tr_id 등)는 유지하고 인증 헤더만 교체하여 다시 요청
+                        headers = {**headers, **self.get_headers()}
+                    except TokenFailedException as e:
+                        # 토큰 갱신 실패는 호출자에게 전파 (최상위에서 정리 후 종료)
+                        raise FatalTokenError(f"토큰 갱신 실패 - {str(e)}") from e
+                    continue
                 
-                return self._standardize_response(json_response)
-            except json.JSONDecodeError:
-                error_msg = "응답이 유효한 JSON 형식이 아닙니다"
-                logger.error(f"{error_msg}: {response.text[:200]}")  # 긴 응답은 앞부분만 로깅
-                return self._standardize_response({"error": error_msg}, success=False)
+                if response.status_code != 200:
+                    error_msg = f"API 오류: 상태 코드 {response.status_code}"
+                    logger.error(f"{error_msg} - {response.text[:200]}")  # 긴 응답은 앞부분만 로깅
+                    return self._standardize_response({"error": error_msg}, success=False, 
+                                                    code=str(response.status_code))
                 
-        except requests.exceptions.Timeout:
-            error_msg = f"API 요청 타임아웃: {url}"
-            logger.error(error_msg)
-            return self._standardize_response({"error": error_msg}, success=False, code="TIMEOUT")
-        except requests.exceptions.ConnectionError:
-            error_msg = f"API 서버 연결 실패: {url}"
-            logger.error(error_msg)
-            return self._standardize_response({"error": error_msg}, success=False, code="CONNECTION_ERROR")
-        except Exception as e:
-            error_msg = f"API 요청 중 오류 발생: {str(e)}"
-            logger.error(error_msg)
-            return self._standardize_response({"error": error_msg}, success=False)
+                try:
+                    json_response = json_codec.loads(response.content)
+                    # 연속 조회에 필요한 헤더만 저장 (requests 헤더는 대소문자 구분 없이 조회 가능)
+                    json_response['_response_headers'] = {'tr_cont': response.headers.get('tr_cont', '')}
+                    
+                    # 디버그 로깅 - API 응답 기본 정보
+                    if 'return_code' in json_response:
+                        logger.debug("API 응답: 코드 {} - {}", json_response['return_code'], json_response.get('return_msg', ''))
+                    elif 'rt_cd' in json_response:
+                        logger.debug("API 응답: 코드 {} - {}", json_response['rt_cd'], json_response.get('msg1', ''))
+                    
+                    return self._standardize_response(json_response)
+                except json.JSONDecodeError:
+                    error_msg = "응답이 유효한 JSON 형식이 아닙니다"
+                    logger.error(f"{error_msg}: {response.text[:200]}")  # 긴 응답은 앞부분만 로깅
+                    return self._standardize_response({"error": error_msg}, success=False)
+                    
+            except requests.exceptions.Timeout:
+                error_msg = f"API 요청 타임아웃: {url}"
+                logger.error(error_msg)
+                return self._standardize_response({"error": error_msg}, success=False, code="TIMEOUT")
+            except requests.exceptions.ConnectionError:
+                error_msg = f"API 서버 연결 실패: {url}"
+                logger.error(error_msg)
+                return self._standardize_response({"error": error_msg}, success=False, code="CONNECTION_ERROR")
+            except FatalTokenError:
+                raise
+            except Exception as e:
+                error_msg = f"API 요청 중 오류 발생: {str(e)}"
+                logger.error(error_msg)
+                return self._standardize_response({"error": error_msg}, success=False)
     
     def _standardize_response(self, response_data, success=True, code=None):
         """다양한 API 응답 형식을 표준화"""
@@ -140,7 +192,7 @@ class StockAPIClient(ABC):
         elif 'return_code' in response_data:
             return_code = response_data['return_code']
             # 문자열 또는 숫자 0이 성공
-            if str(return_code) != '0':
+            if return_code not in (0, '0'):
                 success = False
                 code = str(return_code)  # 코드는 문자열로 표준화
                 message = response_data.get('return_msg', '알 수 없는 오류')
@@ -160,9 +212,14 @@ class StockAPIClient(ABC):
             error=None if success else message,
             code=code,
             message=message
-        ).to_dict()
+        )
     
     @abstractmethod
     def get_stock_list(self, market_type):
         """시장별 종목 리스트 조회 메서드"""
-        pass
\ No newline at end of file
+        pass
+
+
+class FatalTokenError(RuntimeError):
+    """토큰 발급/갱신 실패로 더 이상 요청을 진행할 수 없는 경우의 예외"""
+    pass
\ No newline at end of file
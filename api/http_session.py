@@ -0,0 +1,27 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+# 호스트당 유지하는 최대 커넥션 수 (동시 요청 스레드 수의 상한으로도 사용)
+POOL_MAXSIZE = 20
+
+
+def create_session(pool_connections=10, pool_maxsize=POOL_MAXSIZE, max_retries=None):
+    """커넥션 풀이 설정된 requests 세션 생성
+
+    keep-alive 커넥션을 재사용하여 요청마다 TCP/TLS 핸드셰이크가 반복되지 않도록 한다.
+    max_retries를 지정하지 않으면 5xx 응답에 대해 백오프 재시도를 적용한다.
+    """
+    if max_retries is None:
+        max_retries = Retry(total=3, backoff_factor=0.3, status_forcelist=[500, 502, 503, 504])
+    
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=max_retries
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
@@ -1,110 +1,121 @@
+import sys
+
 from loguru import logger
 
-from api.base_client import StockAPIClient
+from api.base_client import StockAPIClient, FatalTokenError
+from api.token_manager import TokenFailedException
 from config.settings import KIWOOM_API_HOST
 
 
+# 종목 리스트 추가 정보 필드 (원본 필드명, 표준 필드명)
+_OPTIONAL_FIELDS = (
+    ('lastPrice', 'last_price'),
+    ('auditInfo', 'audit_info'),
+    ('state', 'state'),
+)
+
+
 class KiwoomAPIClient(StockAPIClient):
     """키움증권 API 클라이언트"""
     
-    def __init__(self, token_manager):
-        super().__init__(token_manager)
+    def __init__(self, token_manager, session=None):
+        super().__init__(token_manager, session=session)
         self.base_url = KIWOOM_API_HOST
     
     def get_headers(self, api_id=None, cont_yn='N', next_key=''):
         """키움증권 API 요청 헤더 생성"""
         token = self.token_manager.get_token_for_header()
-        headers = {
-            'Content-Type': 'application/json;charset=UTF-8',
-            'authorization': f'Bearer {token}'
-        }
+        
+        # 토큰이 갱신된 경우에만 기본 헤더 재생성
+        if token != self._base_headers_token:
+            self._base_headers = {
+                'Content-Type': 'application/json;charset=UTF-8',
+                'authorization': f'Bearer {token}'
+            }
+            self._base_headers_token = token
         
         # API ID가 제공된 경우 추가 헤더 설정
         if api_id:
-            headers.update({
+            return {
+                **self._base_headers,
                 'cont-yn': cont_yn,
                 'next-key': next_key,
                 'api-id': api_id
-            })
+            }
             
-        return headers
+        return self._base_headers.copy()
+    
+    def _fetch_raw_list(self, market_type):
+        """시장별 종목 리스트 원본 조회 (실패 시 빈 리스트 반환)
+        market_type: 0(코스피), 10(코스닥)
+        """
+        endpoint = '/api/dostk/stkinfo'
+        headers = self.get_headers(api_id='ka10099', cont_yn='N', next_key='')
+        
+        data = {
+            'mrkt_tp': str(market_type)
+        }
+        
+        # API 요청 실행
+        response = self.execute_request('POST', endpoint, data=data, headers=headers)
+        
+        # 응답 데이터 추출
+        if not response.success:
+            error_msg = response.error or '알 수 없는 오류'
+            logger.error(f"키움증권 종목 리스트 조회 실패: {error_msg}")
+            return []
+        
+        response_data = response.data
+        
+        # 응답 확인 - 새로운 구조에 맞게 수정 (return_code가 문자열이 아닌 숫자로 옴)
+        if response_data.get('return_code') not in (0, '0'):
+            error_msg = response_data.get('return_msg', '알 수 없는 오류')
+            error_code = response_data.get('return_code', 'UNKNOWN')
+            logger.error(f"키움증권 API 오류: 코드 {error_code} - {error_msg}")
+            return []
+        
+        if 'list' in response_data and isinstance(response_data['list'], list):
+            return response_data['list']
+        
+        logger.warning(f"응답에 list 필드가 없거나 예상과 다른 형식입니다")
+        return []
     
     def get_stock_list(self, market_type):
         """시장별 종목 리스트 조회
         market_type: 0(코스피), 10(코스닥)
         """
         try:
-            endpoint = '/api/dostk/stkinfo'
-            headers = self.get_headers(api_id='ka10099', cont_yn='N', next_key='')
-            
-            data = {
-                'mrkt_tp': str(market_type)
-            }
-            
-            # API 요청 실행
-            response = self.execute_request('POST', endpoint, data=data, headers=headers)
-            
-            # 응답 데이터 추출
-            if not response.get('success', False):
-                error_msg = response.get('error', '알 수 없는 오류')
-                logger.error(f"키움증권 종목 리스트 조회 실패: {error_msg}")
-                return {'output1': []}
-            
-            response_data = response.get('data', {})
-            
-            # 응답 확인 - 새로운 구조에 맞게 수정 (return_code가 문자열이 아닌 숫자로 옴)
-            if 'return_code' in response_data and (response_data['return_code'] == '0' or response_data['return_code'] == 0):
-                
-                if 'list' in response_data and isinstance(response_data['list'], list):
-                    # 리스트를 표준 형식으로 변환
-                    output1 = self._convert_stock_list(response_data['list'], market_type)
-                    return {'output1': output1}
-                else:
-                    logger.warning(f"응답에 list 필드가 없거나 예상과 다른 형식입니다")
-                    return {'output1': []}
-            else:
-                error_msg = response_data.get('return_msg', '알 수 없는 오류')
-                error_code = response_data.get('return_code', 'UNKNOWN')
-                logger.error(f"키움증권 API 오류: 코드 {error_code} - {error_msg}")
-                return {"output1": []}
+            # 리스트를 표준 형식으로 변환
+            raw_list = self._fetch_raw_list(market_type)
+            return {'output1': self._convert_stock_list(raw_list, market_type)}
             
+        except (TokenFailedException, FatalTokenError):
+            # 토큰 오류는 상위 호출자에서 처리
+            raise
         except Exception as e:
             logger.error(f"키움증권 종목 리스트 조회 실패: {str(e)}")
             return {"output1": []}
     
     def _convert_stock_list(self, stock_list, market_type):
         """종목 리스트를 표준 형식으로 변환"""
-        result = []
-        
-        # 마켓 타입에 따른 마켓 이름
-        market_name = "KOSPI" if str(market_type) == "0" else "KOSDAQ"
+        # 마켓 타입에 따른 마켓 이름 (루프 밖에서 한 번만 계산)
+        is_kospi = str(market_type) == "0"
+        market_name = "KOSPI" if is_kospi else "KOSDAQ"
         
-        for item in stock_list:
-            # 코스피(0)인 경우 marketName이 '거래소'인 종목만 수집
-            if str(market_type) == "0" and item.get('marketName') != '거래소':
-                continue
-                
-            # 응답 데이터의 필드명에 맞게 조정
-            if 'code' in item and 'name' in item:
-                standard_item = {
-                    'code': item['code'],
-                    'name': item['name'],
-                    'market': item.get('marketName', market_name)
-                }
-                
-                # 추가 정보가 있다면 포함
-                if 'lastPrice' in item:
-                    standard_item['last_price'] = item['lastPrice']
-                
-                if 'auditInfo' in item:
-                    standard_item['audit_info'] = item['auditInfo']
-                
-                if 'state' in item:
-                    standard_item['state'] = item['state']
-                
-                result.append(standard_item)
-        
-        return result
+        # 코스피(0)인 경우 marketName이 '거래소'인 종목만 수집
+        return [
+            {
+                'code': item['code'],
+                'name': item['name'],
+                # 마켓명은 몇 가지 값만 반복되므로 intern하여 행마다 같은 문자열 객체를 공유
+                # (marketName이 없는 경우에만 마켓 타입 이름 사용)
+                'market': sys.intern(market) if (market := item.get('marketName')) is not None else market_name,
+                # 추가 정보 (값이 없는 필드도 None으로 포함하여 항상 같은 키 구성 유지)
+                **{dst: item.get(src) for src, dst in _OPTIONAL_FIELDS}
+            }
+            for item in stock_list
+            if (not is_kospi or item.get('marketName') == '거래소') and 'code' in item and 'name' in item
+        ]
     
     def _parse_stock_list_response(self, response_data):
         """종목 리스트 응답 파싱"""
@@ -128,25 +139,27 @@ class KiwoomAPIClient(StockAPIClient):
             [{'code': '000660', 'name': 'SK하이닉스'}, ...]
         """
         try:
-            # 기존 API로 종목 리스트 가져오기
-            response = self.get_stock_list(market_type)
+            # 원본 종목 리스트에서 바로 추출 (표준 형식 변환 단계 생략)
+            raw_list = self._fetch_raw_list(market_type)
             
-            if not response or 'output1' not in response or not response['output1']:
+            if not raw_list:
                 logger.warning(f"간소화된 종목 리스트 생성 실패: 원본 데이터 없음")
                 return []
             
-            # 코드와 이름만 추출하여 간소화된 리스트 생성
-            simple_list = []
-            for item in response['output1']:
-                if 'code' in item and 'name' in item:
-                    simple_list.append({
-                        'code': item['code'],
-                        'name': item['name']
-                    })
+            # 코드와 이름만 추출하여 간소화된 리스트 생성 (코스피는 '거래소' 종목만)
+            is_kospi = str(market_type) == "0"
+            simple_list = [
+                {'code': item['code'], 'name': item['name']}
+                for item in raw_list
+                if (not is_kospi or item.get('marketName') == '거래소') and 'code' in item and 'name' in item
+            ]
             
             logger.info(f"간소화된 종목 리스트 생성 완료: {len(simple_list)}개 종목")
             return simple_list
             
+        except (TokenFailedException, FatalTokenError):
+            # 토큰 오류는 상위 호출자에서 처리
+            raise
         except Exception as e:
             logger.error(f"간소화된 종목 리스트 생성 실패: {str(e)}")
             return []
\ No newline at end of file
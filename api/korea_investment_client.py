@@ -1,35 +1,48 @@
 from loguru import logger
-import time
+from itertools import chain, islice
 from datetime import datetime, timedelta
 
-from api.base_client import StockAPIClient
-from config.settings import KIS_API_HOST
+from api.base_client import StockAPIClient, FatalTokenError
+from api.token_manager import TokenFailedException
+from config.settings import KIS_API_HOST, KIS_REQUESTS_PER_SECOND
+from utils.rate_limiter import RateLimiter
+
+
+# 호스트 단위 호출 제한 (같은 프로세스의 모든 클라이언트가 공유)
+_rate_limiter = RateLimiter(KIS_REQUESTS_PER_SECOND)
 
 
 class KoreaInvestmentAPIClient(StockAPIClient):
     """한국투자증권 API 클라이언트"""
     
-    def __init__(self, token_manager):
-        super().__init__(token_manager)
+    def __init__(self, token_manager, session=None):
+        super().__init__(token_manager, session=session)
         self.base_url = KIS_API_HOST
+        self.rate_limiter = _rate_limiter
+        # 일별 주가 조회 엔드포인트
+        self._daily_endpoint = '/uapi/domestic-stock/v1/quotations/inquire-daily-itemchartprice'
         # 종목명 저장용 딕셔너리
         self.stock_names = {}
     
     def get_headers(self, tr_id=None):
         """한국투자증권 API 요청 헤더 생성"""
-        token_data = self.token_manager.get_token()
-        headers = {
-            'Content-Type': 'application/json; charset=utf-8',
-            'authorization': f'Bearer {token_data.get("access_token", "")}',
-            'appkey': self.token_manager.app_key,
-            'appsecret': self.token_manager.app_secret,
-        }
+        token = self.token_manager.get_token().get("access_token", "")
+        
+        # 토큰이 갱신된 경우에만 기본 헤더 재생성
+        if token != self._base_headers_token:
+            self._base_headers = {
+                'Content-Type': 'application/json; charset=utf-8',
+                'authorization': f'Bearer {token}',
+                'appkey': self.token_manager.app_key,
+                'appsecret': self.token_manager.app_secret,
+            }
+            self._base_headers_token = token
         
         # TR ID가 지정된 경우 추가
         if tr_id:
-            headers['tr_id'] = tr_id
+            return {**self._base_headers, 'tr_id': tr_id}
         
-        return headers
+        return self._base_headers.copy()
     
     def get_stock_list(self, market_type):
         """시장별 종목 리스트 조회 (한국투자증권은 미구현)"""
@@ -63,47 +76,51 @@ class KoreaInvestmentAPIClient(StockAPIClient):
                 start_date = start_dt.strftime('%Y%m%d')
         
         # API 엔드포인트
-        endpoint = '/uapi/domestic-stock/v1/quotations/inquire-daily-itemchartprice'
+        endpoint = self._daily_endpoint
         
-        # 결과 저장용 리스트
-        all_data = []
+        # 결과 저장용 리스트 (페이지 단위로 보관 후 마지막에 한 번에 병합)
+        chunks = []
+        total = 0
         
-        # 연속 조회 관련 변수
-        tr_cont = ""  # 초기 조회는 빈 문자열
+        # 요청 파라미터 (연속 조회 중에도 변하지 않음)
+        params = {
+            'FID_COND_MRKT_DIV_CODE': 'J',    # KRX
+            'FID_INPUT_ISCD': stock_code,      # 종목코드
+            'FID_INPUT_DATE_1': start_date,    # 조회 시작일
+            'FID_INPUT_DATE_2': end_date,      # 조회 종료일
+            'FID_PERIOD_DIV_CODE': period,     # 기간분류코드
+            'FID_ORG_ADJ_PRC': '1' if is_adjusted else '0'  # 수정주가(1)/원주가(0)
+        }
+        
+        # 연속 조회 여부 (첫 요청 이후 tr_cont 헤더 설정에 사용)
+        tr_cont = ''
         
         # API 연속 호출을 위한 루프
         while True:
             try:
-                params = {
-                    'FID_COND_MRKT_DIV_CODE': 'J',    # KRX
-                    'FID_INPUT_ISCD': stock_code,      # 종목코드
-                    'FID_INPUT_DATE_1': start_date,    # 조회 시작일
-                    'FID_INPUT_DATE_2': end_date,      # 조회 종료일
-                    'FID_PERIOD_DIV_CODE': period,     # 기간분류코드
-                    'FID_ORG_ADJ_PRC': '1' if is_adjusted else '0'  # 수정주가(1)/원주가(0)
-                }
-                
+                # 요청 헤더 (토큰 갱신이 반영되도록 매 요청마다 생성, 기본 헤더는 캐시됨)
                 headers = self.get_headers('FHKST03010100')  # TR ID 설정
-                
-                # 연속 조회 설정
                 if tr_cont:
-                    headers.update({'tr_cont': tr_cont})
+                    headers['tr_cont'] = tr_cont
                 
+                # 호출 한도에 도달한 경우에만 대기 (API 제한 방지)
+                self.rate_limiter.wait()
                 response = self.execute_request('GET', endpoint, params=params, headers=headers)
                 
                 # 응답 확인
-                if not response.get('success', False):
-                    error_msg = response.get('error', '알 수 없는 오류')
+                if not response.success:
+                    error_msg = response.error or '알 수 없는 오류'
                     logger.error(f"일별 주가 조회 실패: {error_msg}")
                     break
                 
                 # 응답 데이터 추출
-                response_data = response.get('data', {})
+                response_data = response.data
                 
                 # 응답에서 데이터 추출 (output2가 차트 데이터)
                 if 'output2' in response_data and isinstance(response_data['output2'], list):
                     data_chunk = response_data['output2']
-                    all_data.extend(data_chunk)
+                    chunks.append(data_chunk)
+                    total += len(data_chunk)
                     
                     # 종목명 정보 저장
                     if 'output1' in response_data and 'hts_kor_isnm' in response_data['output1']:
@@ -111,7 +128,7 @@ class KoreaInvestmentAPIClient(StockAPIClient):
                         self.stock_names[stock_code] = stock_name
                     
                     # 데이터가 없거나, 최대 개수에 도달한 경우 종료
-                    if not data_chunk or (max_count and len(all_data) >= max_count):
+                    if not data_chunk or (max_count and total >= max_count):
                         break
                     
                     # 연속 조회 필요 여부 확인
@@ -124,21 +141,23 @@ class KoreaInvestmentAPIClient(StockAPIClient):
                     
                     # 연속 조회 시 tr_cont 값 설정
                     tr_cont = 'N'
-                    
-                    # 연속 조회 시 잠시 대기 (API 제한 방지)
-                    time.sleep(0.5)
                 else:
                     # 응답 데이터가 없는 경우 종료
                     logger.warning(f"일별 주가 조회 응답에 output2 데이터가 없습니다.")
                     break
                 
+            except (TokenFailedException, FatalTokenError):
+                # 토큰 오류는 상위 호출자에서 처리
+                raise
             except Exception as e:
                 logger.error(f"일별 주가 조회 실패: {str(e)}")
                 break
         
-        # 최대 개수 제한
-        if max_count and len(all_data) > max_count:
-            all_data = all_data[:max_count]
+        # 페이지 병합 (최대 개수 제한 적용)
+        if max_count:
+            all_data = list(islice(chain.from_iterable(chunks), max_count))
+        else:
+            all_data = list(chain.from_iterable(chunks))
         
         # 최종 응답 생성
         return {
@@ -1,16 +1,50 @@
 import os
-import json
 import time
+import random
+import tempfile
+import threading
+import weakref
 import requests
+from dataclasses import dataclass, fields
 from datetime import datetime, timedelta
 from loguru import logger
 from abc import abstractmethod
 from pathlib import Path
 
+from api.http_session import create_session
+from utils import json_codec
+
+
+# 토큰 만료 일시 형식 (YYYYMMDDHHMMSS)
+_EXPIRES_DT_FORMAT = "%Y%m%d%H%M%S"
+
+
+@dataclass
+class TokenRecord:
+    """토큰 파일에 저장된 토큰 정보"""
+    access_token: str = ""   # 한국투자증권
+    token: str = ""          # 키움증권
+    token_type: str = ""
+    expires_dt: str = ""
+
+
+# 토큰 파일에서 읽어올 필드 (그 외 응답 필드는 무시)
+_TOKEN_RECORD_FIELDS = frozenset(f.name for f in fields(TokenRecord))
+
+
+def _parse_expires_dt(expires_dt):
+    """YYYYMMDDHHMMSS 형식의 만료 일시 문자열을 datetime으로 변환 (형식이 다르면 ValueError)"""
+    if len(expires_dt) != 14:
+        raise ValueError(f"만료 일시 형식이 올바르지 않습니다: {expires_dt}")
+    return datetime.strptime(expires_dt, _EXPIRES_DT_FORMAT)
+
 
 class TokenManager:
     """기본 토큰 관리자 클래스"""
     
+    # 토큰 발급 요청용 공유 세션 (재시도는 get_token에서 직접 처리하므로 어댑터 재시도는 끔)
+    _session = create_session(max_retries=0)
+    
     def __init__(self, app_key, app_secret):
         if not app_key or not app_secret:
             raise ValueError("API 키와 시크릿은 필수 값입니다")
@@ -18,39 +52,107 @@ class TokenManager:
         self.app_key = app_key
         self.app_secret = app_secret
         self.token = None
-        self.expires_at = None
+        self.expires_at = None  # 만료 일시 (로그 및 파일 저장용)
+        # 만료 시각의 monotonic 기준 값 (시스템 시계 변경과 무관하게 만료 판단)
+        self._expires_mono = None
+        self._deadline_mono = None  # 만료 10분 전 (이 시점부터 만료된 것으로 간주)
         self.token_type = None
-        self.refresh_token = None
+        self._refresh_token_value = None  # refresh_token() 메서드를 가리지 않도록 별도 이름 사용
         self.max_retries = 3
         self.retry_delay = 1
+        self.backoff_cap = 60  # 재시도 대기 시간 상한 (초)
+        # 토큰 발급이 동시에 여러 번 일어나지 않도록 보호 (요청 스레드 / 백그라운드 갱신)
+        self._lock = threading.Lock()
+        self._refresh_timer = None
+    
+    def __del__(self):
+        self._cancel_refresh_timer()
     
     def get_token(self):
         """유효한 토큰 반환"""
         if self.token is None or self._is_token_expired():
+            with self._lock:
+                # 락을 기다리는 동안 다른 스레드가 이미 발급했으면 그대로 사용
+                if self.token is None or self._is_token_expired():
+                    self._issue_token_with_retry()
+                
+        return self.token
+    
+    def _issue_token_with_retry(self):
+        """토큰 발급 (실패 시 최대 max_retries번 재시도, 호출 측에서 락 보유)"""
+        success = self.issue_token()
+        
+        # 토큰 발급 실패 시 최대 3번 재시도
+        retries = 0
+        while not success and retries < self.max_retries:
+            retries += 1
+            logger.warning(f"토큰 발급 재시도 {retries}/{self.max_retries}...")
+            # 상한이 있는 지수 백오프 + 지터 (여러 프로세스가 동시에 재시도하지 않도록 분산)
+            time.sleep(min(self.backoff_cap, self.retry_delay * (2 ** retries)) * (0.5 + random.random() * 0.5))
             success = self.issue_token()
             
-            # 토큰 발급 실패 시 최대 3번 재시도
-            retries = 0
-            while not success and retries < self.max_retries:
-                retries += 1
-                logger.warning(f"토큰 발급 재시도 {retries}/{self.max_retries}...")
-                time.sleep(self.retry_delay * retries)  # 지수 백오프
-                success = self.issue_token()
-                
+        if not success:
+            # 토큰 발급 실패 시 예외 발생
+            error_msg = f"{self.__class__.__name__} 토큰 발급 실패"
+            logger.error(error_msg)
+            raise TokenFailedException(error_msg)
+    
+    def _start_refresh_timer(self):
+        """만료 15분 전에 백그라운드에서 토큰을 미리 재발급하도록 타이머 설정"""
+        self._cancel_refresh_timer()
+        if self.expires_at is None:
+            return
+        
+        delay = (self.expires_at - datetime.now() - timedelta(minutes=15)).total_seconds()
+        if delay <= 0:
+            # 이미 갱신 시점이 지났으면 get_token에서 필요할 때 발급
+            return
+        
+        # 타이머가 인스턴스를 붙잡아 두지 않도록 약한 참조로 전달
+        timer = threading.Timer(delay, TokenManager._background_refresh, args=(weakref.ref(self),))
+        timer.daemon = True
+        timer.start()
+        self._refresh_timer = timer
+    
+    def _cancel_refresh_timer(self):
+        """예약된 백그라운드 갱신 취소"""
+        timer = getattr(self, '_refresh_timer', None)
+        if timer is not None:
+            timer.cancel()
+            self._refresh_timer = None
+    
+    @staticmethod
+    def _background_refresh(manager_ref):
+        """백그라운드 토큰 재발급 (성공 시 issue_token에서 다음 타이머를 다시 설정)"""
+        manager = manager_ref()
+        if manager is None:
+            return
+        
+        logger.info(f"{manager.__class__.__name__} 토큰 만료 전 백그라운드 갱신 시작")
+        try:
+            with manager._lock:
+                success = manager.issue_token()
             if not success:
-                # 토큰 발급 실패 시 예외 발생
-                error_msg = f"{self.__class__.__name__} 토큰 발급 실패"
-                logger.error(error_msg)
-                raise TokenFailedException(error_msg)
-                
-        return self.token
+                logger.warning(f"{manager.__class__.__name__} 백그라운드 토큰 갱신 실패 - 다음 요청 시 다시 발급합니다")
+        except Exception as e:
+            logger.error(f"백그라운드 토큰 갱신 중 오류 발생: {str(e)}")
     
     def _is_token_expired(self):
         """토큰 만료 여부 확인"""
-        if self.expires_at is None:
-            return True
         # 만료 10분 전부터는 만료된 것으로 간주
-        return datetime.now() > (self.expires_at - timedelta(minutes=10))
+        return self._deadline_mono is None or time.monotonic() > self._deadline_mono
+    
+    def _set_expires_at(self, expires_at):
+        """만료 시간 설정 (만료 판단용 monotonic 기준 시각도 함께 갱신)"""
+        self.expires_at = expires_at
+        self._expires_mono = time.monotonic() + (expires_at - datetime.now()).total_seconds()
+        self._deadline_mono = self._expires_mono - 600
+    
+    def seconds_until_expiry(self):
+        """토큰 만료까지 남은 시간(초) 반환 (토큰이 없으면 0)"""
+        if self.token is None or self._expires_mono is None:
+            return 0
+        return self._expires_mono - time.monotonic()
     
     @abstractmethod
     def issue_token(self):
@@ -64,12 +166,23 @@ class TokenManager:
             directory = os.path.dirname(filename)
             os.makedirs(directory, exist_ok=True)
             
+            # 저장된 토큰과 내용이 같으면 다시 쓰지 않음 (발급 시각 제외하고 비교)
+            if self._is_token_file_unchanged(token_data, filename):
+                logger.debug("토큰 정보가 변경되지 않아 저장을 생략합니다: {}", filename)
+                return True
+            
             # 현재 시간 추가
             token_data["issued_at"] = int(datetime.now().timestamp())
             
-            # 파일에 저장
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(token_data, f, ensure_ascii=False)
+            # 임시 파일에 쓴 뒤 교체하여 쓰기 도중 중단되어도 기존 파일이 깨지지 않도록 함
+            with tempfile.NamedTemporaryFile('wb', delete=False, dir=directory, suffix='.tmp') as f:
+                f.write(json_codec.dumps(token_data))
+                tmp_path = f.name
+            try:
+                os.replace(tmp_path, filename)
+            except OSError:
+                os.unlink(tmp_path)
+                raise
                 
             logger.info(f"토큰 정보가 저장되었습니다: {filename}")
             return True
@@ -77,6 +190,20 @@ class TokenManager:
             logger.error(f"토큰 정보 저장 실패: {str(e)}")
             return False
     
+    @staticmethod
+    def _is_token_file_unchanged(token_data, filename):
+        """파일에 저장된 토큰 정보가 저장하려는 내용과 같은지 확인 (issued_at 제외)"""
+        try:
+            with open(filename, 'rb') as f:
+                saved = json_codec.loads(f.read())
+        except (OSError, ValueError):
+            return False
+        
+        if not isinstance(saved, dict):
+            return False
+        saved.pop("issued_at", None)
+        return saved == {k: v for k, v in token_data.items() if k != "issued_at"}
+    
     def _load_token_from_file(self, filename):
         """파일에서 토큰 정보 로드"""
         try:
@@ -86,41 +213,34 @@ class TokenManager:
                 return None
                 
             # 파일에서 읽기
-            with open(filename, 'r', encoding='utf-8') as f:
-                token_data = json.load(f)
+            with open(filename, 'rb') as f:
+                token_data = json_codec.loads(f.read())
                 
             # 유효성 검사
             if not isinstance(token_data, dict):
                 logger.warning(f"토큰 파일 형식이 유효하지 않습니다: {filename}")
                 return None
+            
+            record = TokenRecord(**{k: v for k, v in token_data.items() if k in _TOKEN_RECORD_FIELDS})
                 
             # 만료 시간 확인
-            expires_dt = token_data.get("expires_dt")
+            expires_dt = record.expires_dt
             if expires_dt:
                 try:
-                    # YYYYMMDDHHMMSS 형식 변환
-                    if len(expires_dt) == 14:
-                        exp_year = int(expires_dt[0:4])
-                        exp_month = int(expires_dt[4:6])
-                        exp_day = int(expires_dt[6:8])
-                        exp_hour = int(expires_dt[8:10])
-                        exp_min = int(expires_dt[10:12])
-                        exp_sec = int(expires_dt[12:14])
-                        
-                        expires_at = datetime(exp_year, exp_month, exp_day, exp_hour, exp_min, exp_sec)
-                        
-                        # 토큰이 만료되었는지 확인
-                        if datetime.now() > expires_at:
-                            logger.warning(f"저장된 토큰이 만료되었습니다. 만료 시간: {expires_at}")
-                            return None
-                        
-                        # 만료 시간 저장
-                        self.expires_at = expires_at
+                    expires_at = _parse_expires_dt(expires_dt)
+                    
+                    # 토큰이 만료되었는지 확인
+                    if datetime.now() > expires_at:
+                        logger.warning(f"저장된 토큰이 만료되었습니다. 만료 시간: {expires_at}")
+                        return None
+                    
+                    # 만료 시간 저장
+                    self._set_expires_at(expires_at)
                 except Exception as e:
                     logger.error(f"만료 시간 파싱 오류: {str(e)}")
                     return None
             
-            return token_data
+            return record
                 
         except Exception as e:
             logger.error(f"토큰 파일 로드 실패: {str(e)}")
@@ -128,8 +248,14 @@ class TokenManager:
     
     def refresh_token(self):
         """토큰 갱신"""
-        logger.info(f"{self.__class__.__name__} 토큰 갱신 시작")
-        success = self.issue_token()
+        # 여러 스레드가 동시에 401을 받아도 실제 재발급은 한 번만 수행
+        stale_token = self.token
+        with self._lock:
+            if self.token is not stale_token and not self._is_token_expired():
+                # 락을 기다리는 동안 다른 스레드가 이미 갱신함
+                return True
+            logger.info(f"{self.__class__.__name__} 토큰 갱신 시작")
+            success = self.issue_token()
         if not success:
             raise TokenFailedException(f"{self.__class__.__name__} 토큰 갱신 실패")
         return success
@@ -144,7 +270,7 @@ class TokenManager:
             # 응답 상태 코드 확인
             if response.status_code != 200:
                 # 상세 로그는 디버그 레벨로 변경
-                logger.debug(f"토큰 발급 실패: 상태 코드 {response.status_code} - {response.text[:100]}...")
+                logger.opt(lazy=True).debug("토큰 발급 실패: 상태 코드 {} - {}...", lambda: response.status_code, lambda: response.text[:100])
                 logger.error(f"토큰 발급 실패: 상태 코드 {response.status_code}")
                 return None
                 
@@ -162,7 +288,7 @@ class TokenManager:
                 
             # 만료 시간 설정 (토큰 발급 시간 + 유효기간 - 10분(여유 시간))
             expires_in = result.get("expires_in", 86400)  # 기본값 24시간
-            self.expires_at = datetime.now() + timedelta(seconds=expires_in) - timedelta(minutes=10)
+            self._set_expires_at(datetime.now() + timedelta(seconds=expires_in) - timedelta(minutes=10))
             
             logger.info(f"{self.__class__.__name__} 토큰 발급 성공, 만료 시간: {self.expires_at}")
             return result
@@ -184,11 +310,12 @@ class KoreaInvestmentTokenManager(TokenManager):
         if loaded_token:
             # 토큰 정보 설정
             self.token = {
-                "access_token": loaded_token.get("access_token"),
-                "token_type": loaded_token.get("token_type", "Bearer"),
+                "access_token": loaded_token.access_token,
+                "token_type": loaded_token.token_type or "Bearer",
                 "expires_in": 86400  # 기본 1일
             }
-            self.token_type = loaded_token.get("token_type", "Bearer")
+            self.token_type = loaded_token.token_type or "Bearer"
+            self._start_refresh_timer()
         else:
             # 저장된 토큰이 없으면 새로 발급 시도
             logger.info("저장된 한국투자증권 토큰이 없거나 만료되었습니다. 새로 발급합니다.")
@@ -207,10 +334,10 @@ class KoreaInvestmentTokenManager(TokenManager):
                 "appsecret": self.app_secret
             }
             
-            logger.debug(f"한국투자증권 토큰 발급 요청: {url}")
+            logger.debug("한국투자증권 토큰 발급 요청: {}", url)
             
             try:
-                response = requests.post(url, headers=headers, json=data, timeout=10)
+                response = self._session.post(url, headers=headers, json=data, timeout=10)
             except requests.RequestException as e:
                 logger.error(f"한국투자증권 토큰 요청 실패: {str(e)}")
                 return False
@@ -229,7 +356,7 @@ class KoreaInvestmentTokenManager(TokenManager):
                 self.token_type = result.get("token_type")
                 
                 # 만료 시간 포맷팅 (YYYYMMDDHHMMSS)
-                expires_dt = self.expires_at.strftime("%Y%m%d%H%M%S")
+                expires_dt = self.expires_at.strftime(_EXPIRES_DT_FORMAT)
                 
                 # 파일에 저장할 데이터
                 save_data = {
@@ -243,6 +370,9 @@ class KoreaInvestmentTokenManager(TokenManager):
                 # 파일에 저장
                 self._save_token_to_file(save_data, self.token_file)
                 
+                # 다음 백그라운드 갱신 예약
+                self._start_refresh_timer()
+                
                 return True
             return False
             
@@ -264,10 +394,11 @@ class KiwoomTokenManager(TokenManager):
             logger.info(f"저장된 키움증권 토큰을 사용합니다. 만료 시간: {self.expires_at}")
             # 토큰 정보 설정
             self.token = {
-                "token": loaded_token.get("token"),
-                "token_type": loaded_token.get("token_type", "bearer")
+                "token": loaded_token.token,
+                "token_type": loaded_token.token_type or "bearer"
             }
-            self.token_type = loaded_token.get("token_type", "bearer")
+            self.token_type = loaded_token.token_type or "bearer"
+            self._start_refresh_timer()
         else:
             # 저장된 토큰이 없으면 새로 발급 시도
             logger.info("저장된 키움증권 토큰이 없거나 만료되었습니다. 새로 발급합니다.")
@@ -285,10 +416,10 @@ class KiwoomTokenManager(TokenManager):
                 "appsecret": self.app_secret
             }
             
-            logger.debug(f"키움증권 토큰 발급 요청: {url}")
+            logger.debug("키움증권 토큰 발급 요청: {}", url)
             
             try:
-                response = requests.post(url, headers=headers, json=data, timeout=10)
+                response = self._session.post(url, headers=headers, json=data, timeout=10)
             except requests.RequestException as e:
                 logger.error(f"키움증권 토큰 요청 실패: {str(e)}")
                 return False
@@ -320,22 +451,15 @@ class KiwoomTokenManager(TokenManager):
             expires_dt = result.get("expires_dt")
             if expires_dt and len(expires_dt) == 14:
                 try:
-                    exp_year = int(expires_dt[0:4])
-                    exp_month = int(expires_dt[4:6])
-                    exp_day = int(expires_dt[6:8])
-                    exp_hour = int(expires_dt[8:10])
-                    exp_min = int(expires_dt[10:12])
-                    exp_sec = int(expires_dt[12:14])
-                    
-                    self.expires_at = datetime(exp_year, exp_month, exp_day, exp_hour, exp_min, exp_sec)
+                    self._set_expires_at(_parse_expires_dt(expires_dt))
                     logger.info(f"키움증권 토큰 만료 시간: {self.expires_at}")
                 except Exception as e:
                     logger.error(f"키움증권 만료 시간 파싱 오류: {str(e)}")
                     # 기본 만료 시간 설정 (24시간)
-                    self.expires_at = datetime.now() + timedelta(hours=24) - timedelta(minutes=10)
+                    self._set_expires_at(datetime.now() + timedelta(hours=24) - timedelta(minutes=10))
             else:
                 # 기본 만료 시간 설정 (24시간)
-                self.expires_at = datetime.now() + timedelta(hours=24) - timedelta(minutes=10)
+                self._set_expires_at(datetime.now() + timedelta(hours=24) - timedelta(minutes=10))
             
             # 토큰 정보 저장
             self.token = {
@@ -348,6 +472,9 @@ class KiwoomTokenManager(TokenManager):
             self._save_token_to_file(result, self.token_file)
             
             logger.info("키움증권 토큰 발급 성공")
+            
+            # 다음 백그라운드 갱신 예약
+            self._start_refresh_timer()
             return True
             
         except Exception as e:
@@ -5,8 +5,88 @@ from datetime import datetime
 from pathlib import Path
 from loguru import logger
 import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
 
+from api.http_session import POOL_MAXSIZE
 from config.settings import DATA_PATH
+from utils import json_codec
+from utils.parquet_schema import PARQUET_COMPRESSION, PRICE_PANDAS_DTYPES
+
+
+# 일별 시세 API 정수 필드 (원본 필드명, 표준 필드명)
+_INT_PRICE_FIELDS = (
+    ('stck_oprc', '시가'),
+    ('stck_hgpr', '고가'),
+    ('stck_lwpr', '저가'),
+    ('stck_clpr', '종가'),
+    ('acml_vol', '거래량'),
+    ('acml_tr_pbmn', '거래대금'),
+)
+
+# 표준화에 사용하는 원본 필드 (응답에 없는 필드는 빈 값으로 채움)
+_RAW_PRICE_COLUMNS = ['stck_bsop_date', *(src for src, _ in _INT_PRICE_FIELDS), 'prdy_ctrt', 'prtt_rate']
+
+# 숫자로 변환하는 원본 필드 (변환할 수 없는 값이 있는 행은 건너뜀)
+_NUMERIC_RAW_COLUMNS = [*(src for src, _ in _INT_PRICE_FIELDS), 'prdy_ctrt']
+
+# 값이 비어 있으면 0으로 보는 원본 필드 (거래대금/등락률)
+_BLANK_AS_ZERO_COLUMNS = ('acml_tr_pbmn', 'prdy_ctrt')
+
+# 개별 파일 저장 시 쓰기 버퍼 크기 (1MB)
+_WRITE_BUFFER_SIZE = 1 << 20
+
+def _normalize_code(code):
+    """종목코드 형식 보정 (숫자로만 구성된 코드라면 6자리 맞추기)"""
+    code = code.strip()
+    return code.zfill(6) if code.isdigit() else code
+
+
+@lru_cache(maxsize=4)
+def _latest_stock_list(dir_path, mtime):
+    """디렉토리에서 파일명 기준 가장 최신 종목 리스트 JSON 파일 반환 (mtime은 캐시 키로만 사용)"""
+    return max(Path(dir_path).glob('stock_list_*.json'), default=None)
+
+
+@lru_cache(maxsize=4)
+def _read_stock_names(path, mtime):
+    """종목 리스트 파일(JSON/CSV)에서 종목코드-종목명 매핑 생성
+
+    mtime은 캐시 키로만 사용하며, 파일이 갱신되면 다시 읽는다.
+    반환된 딕셔너리는 캐시와 공유되므로 호출 측에서 수정하지 않는다.
+    """
+    if path.endswith('.json'):
+        with open(path, 'r', encoding='utf-8') as f:
+            stock_list = json.load(f)
+        
+        # JSON 형식에 따라 매핑 생성 (다양한 필드명 형식 지원)
+        if isinstance(stock_list, list):
+            return {
+                code: name
+                for stock in stock_list if isinstance(stock, dict)
+                if (code := stock.get('code') or stock.get('종목코드'))
+                and (name := stock.get('name') or stock.get('종목명'))
+            }
+    
+    elif path.endswith('.csv'):
+        df = pd.read_csv(path, encoding='utf-8-sig')
+        
+        # CSV 컬럼명 확인
+        code_col = None
+        name_col = None
+        
+        for col in df.columns:
+            if col.lower() in ['code', '종목코드', 'stock_code']:
+                code_col = col
+            elif col.lower() in ['name', '종목명', 'stock_name']:
+                name_col = col
+        
+        if code_col and name_col:
+            # 데이터프레임에서 종목코드-종목명 매핑 생성 (행 단위 iterrows 없이 컬럼 단위로 처리)
+            codes = df[code_col].astype(str).map(_normalize_code)
+            return dict(zip(codes, df[name_col]))
+    
+    return {}
 
 
 class PriceDataCollector:
@@ -18,6 +98,8 @@ class PriceDataCollector:
         self.data_path.mkdir(exist_ok=True, parents=True)
         # 종목명 사전 (코드 -> 종목명 매핑)
         self.stock_names = {}
+        # 종목명을 찾지 못한 종목의 임시 이름 (실제 종목명 사전과 분리하여 보관)
+        self._placeholder_names = {}
         self._load_stock_names()
     
     def _load_stock_names(self):
@@ -34,10 +116,9 @@ class PriceDataCollector:
                 stock_list_dir = DATA_PATH / 'stock_list'
                 if stock_list_dir.exists():
                     # 날짜 패턴(YYYYMMDD)으로 된 파일들 중 가장 최신 파일 찾기
-                    json_files = list(stock_list_dir.glob('stock_list_*.json'))
-                    if json_files:
-                        # 파일명 기준 내림차순 정렬
-                        latest_file = sorted(json_files, reverse=True)[0]
+                    # (디렉토리 수정 시각이 같으면 이전 검색 결과 재사용)
+                    latest_file = _latest_stock_list(str(stock_list_dir), stock_list_dir.stat().st_mtime)
+                    if latest_file is not None:
                         stock_list_paths.append(latest_file)
             except Exception as e:
                 logger.error(f"최신 종목 리스트 파일 검색 중 오류: {str(e)}")
@@ -62,41 +143,8 @@ class PriceDataCollector:
                 continue
                 
             try:
-                if str(path).endswith('.json'):
-                    with open(path, 'r', encoding='utf-8') as f:
-                        stock_list = json.load(f)
-                    
-                    # JSON 형식에 따라 매핑 생성
-                    if isinstance(stock_list, list):
-                        for stock in stock_list:
-                            if isinstance(stock, dict):
-                                # 다양한 필드명 형식 지원
-                                code = stock.get('code') or stock.get('종목코드')
-                                name = stock.get('name') or stock.get('종목명')
-                                if code and name:
-                                    self.stock_names[code] = name
-                
-                elif str(path).endswith('.csv'):
-                    df = pd.read_csv(path, encoding='utf-8-sig')
-                    
-                    # CSV 컬럼명 확인
-                    code_col = None
-                    name_col = None
-                    
-                    for col in df.columns:
-                        if col.lower() in ['code', '종목코드', 'stock_code']:
-                            code_col = col
-                        elif col.lower() in ['name', '종목명', 'stock_name']:
-                            name_col = col
-                    
-                    if code_col and name_col:
-                        # 데이터프레임에서 종목코드-종목명 매핑 생성
-                        for _, row in df.iterrows():
-                            code = str(row[code_col]).strip()
-                            # 종목코드 형식 보정 (숫자로만 구성된 코드라면 6자리 맞추기)
-                            if code.isdigit():
-                                code = code.zfill(6)
-                            self.stock_names[code] = row[name_col]
+                # 같은 파일(수정 시각 포함)은 프로세스 내에서 한 번만 파싱
+                self.stock_names.update(_read_stock_names(str(path), os.stat(path).st_mtime))
                 
                 # 파일 하나만 성공적으로 로드되면 중단
                 break
@@ -106,29 +154,26 @@ class PriceDataCollector:
         
     
     def get_stock_name(self, stock_code):
-        """종목 코드에 해당하는 종목명 반환"""
-        # 종목코드 형식 보정 (숫자로만 구성된 코드라면 6자리 맞추기)
-        if stock_code.isdigit():
-            stock_code = stock_code.zfill(6)
-        
-        # 종목명 사전에 없는 경우, 필요시 API로부터 가져오기 시도
-        if stock_code not in self.stock_names:
-            try:
-                # API를 통해 종목명 가져오기 시도 (구현 필요)
-                # 예: name = self.api_client.get_stock_name(stock_code)
-                # self.stock_names[stock_code] = name
-                
-                # API 구현이 없는 경우 종목코드 뒤에 '(주)' 추가하여 임시 이름 생성
-                self.stock_names[stock_code] = f"{stock_code}(주)"
-                logger.warning(f"종목 {stock_code}의 종목명 정보가 없어 임시 이름을 사용합니다.")
-            except Exception as e:
-                logger.error(f"종목명 조회 실패 ({stock_code}): {str(e)}")
-                return f"{stock_code}"  # 실패 시 종목코드 그대로 반환
+        """종목 코드에 해당하는 종목명 반환 (종목코드는 collect 진입 시 보정된 값)"""
+        name = self.stock_names.get(stock_code)
+        if name is not None:
+            return name
         
-        return self.stock_names[stock_code]
+        # 종목명 사전에 없는 경우 종목코드 뒤에 '(주)' 추가하여 임시 이름 생성
+        # (임시 이름은 별도 보관하여 이후 API 응답의 실제 종목명으로 대체될 수 있도록 함)
+        name = self._placeholder_names.get(stock_code)
+        if name is None:
+            name = self._placeholder_names[stock_code] = f"{stock_code}(주)"
+            logger.warning(f"종목 {stock_code}의 종목명 정보가 없어 임시 이름을 사용합니다.")
+        return name
     
     def collect(self, stock_code, period='D', is_adjusted=True, start_date=None, end_date=None, max_count=None, save_to_file=False):
         """특정 종목의 주가 데이터 수집"""
+        # 종목코드 형식 보정은 진입 시 한 번만 수행하고 이후에는 보정된 코드를 전달
+        return self._collect(_normalize_code(stock_code), period, is_adjusted, start_date, end_date, max_count, save_to_file)
+    
+    def _collect(self, stock_code, period, is_adjusted, start_date=None, end_date=None, max_count=None, save_to_file=False):
+        """보정된 종목코드로 주가 데이터 수집"""
         try:
             # 시작일과 종료일 처리
             start_date_str = self._format_date(start_date) if start_date else None
@@ -144,8 +189,8 @@ class PriceDataCollector:
                 max_count=max_count
             )
             
-            # 데이터 표준화
-            price_data = self.standardize_data(raw_data)
+            # 데이터 표준화 (종목명은 한 번만 조회하여 전달)
+            price_data = self.standardize_data(raw_data, stock_code, self.get_stock_name(stock_code))
             
             # 개별 파일 저장 옵션이 활성화된 경우에만 파일로 저장
             if save_to_file and price_data:
@@ -155,24 +200,29 @@ class PriceDataCollector:
             
         except Exception as e:
             logger.error(f"'{stock_code}' 종목 주가 데이터 수집 실패: {str(e)}")
-            logger.debug(f"상세 오류: {traceback.format_exc()}")
+            logger.opt(lazy=True).debug("상세 오류: {}", traceback.format_exc)
             return []
     
-    def collect_multiple(self, stock_codes, period='D', is_adjusted=True):
-        """여러 종목의 주가 데이터 수집"""
-        results = {}
+    def collect_multiple(self, stock_codes, period='D', is_adjusted=True, max_workers=POOL_MAXSIZE):
+        """여러 종목의 주가 데이터 수집 (스레드로 요청을 동시에 수행)"""
+        # 입력 순서를 유지하도록 먼저 키를 채워둠 (종목코드 형식 보정은 여기서 한 번만 수행)
+        results = {_normalize_code(stock_code): [] for stock_code in stock_codes}
+        if not results:
+            return results
         
-        for stock_code in stock_codes:
-            try:
-                price_data = self.collect(
-                    stock_code=stock_code,
-                    period=period,
-                    is_adjusted=is_adjusted
-                )
-                results[stock_code] = price_data
-            except Exception as e:
-                logger.error(f"종목 {stock_code} 주가 데이터 수집 실패: {str(e)}")
-                results[stock_code] = []
+        # 스레드 수는 세션 커넥션 풀 크기 이내로 제한 (풀 초과 시 커넥션이 버려지고 재연결됨)
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(results))) as executor:
+            futures = {
+                executor.submit(self._collect, stock_code, period, is_adjusted): stock_code
+                for stock_code in results
+            }
+            
+            for future in as_completed(futures):
+                stock_code = futures[future]
+                try:
+                    results[stock_code] = future.result() or []
+                except Exception as e:
+                    logger.error(f"종목 {stock_code} 주가 데이터 수집 실패: {str(e)}")
         
         return results
     
@@ -191,8 +241,9 @@ class PriceDataCollector:
             # 종목명이 API 응답에 있으면 업데이트
             if 'hts_kor_isnm' in additional_info and additional_info['hts_kor_isnm']:
                 stock_name = additional_info['hts_kor_isnm']
-                # 종목명 사전에 추가
+                # 종목명 사전에 추가 (임시 이름이 있었다면 제거)
                 self.stock_names[stock_code] = stock_name
+                self._placeholder_names.pop(stock_code, None)
         
         try:
             # API 응답 구조에 따라 데이터 추출 (output2가 차트 데이터)
@@ -202,44 +253,56 @@ class PriceDataCollector:
                 logger.warning("주가 데이터 형식이 예상과 다릅니다")
                 return []
             
-            for item in items:
-                # 새로운 API 응답 구조에 맞게 조정
-                try:
-                    # 데이터 변환
-                    price = {
-                        '종목코드': stock_code,
-                        '종목명': stock_name,
-                        '거래일': item.get('stck_bsop_date', ''),  # 거래일자
-                        '시가': int(item.get('stck_oprc', 0)),     # 시가
-                        '고가': int(item.get('stck_hgpr', 0)),     # 고가
-                        '저가': int(item.get('stck_lwpr', 0)),     # 저가
-                        '종가': int(item.get('stck_clpr', 0)),     # 종가
-                        '거래량': int(item.get('acml_vol', 0)),    # 거래량
-                        '거래대금': int(item.get('acml_tr_pbmn', 0) or 0),  # 거래대금
-                        '등락률': float(item.get('prdy_ctrt', 0) if item.get('prdy_ctrt') else 0),  # 등락률
-                        '수정주가여부': '수정' if item.get('prtt_rate', '1.00') != '1.00' else '원주가'  # 수정주가 여부
-                    }
-                    
-                    # 회전율 - 별도로 계산 또는 추가 정보에서 가져옴
-                    if 'vol_tnrt' in additional_info:
-                        price['회전율'] = float(additional_info.get('vol_tnrt', 0) or 0)
-                    else:
-                        price['회전율'] = 0.0
-                    
-                    price_data.append(price)
-                except Exception as e:
-                    logger.warning(f"데이터 변환 중 오류 발생 (항목 건너뜀): {str(e)}")
+            if not items:
+                return []
+            
+            # 행 단위 변환 대신 DataFrame 한 번에 컬럼 단위로 변환
+            raw = pd.DataFrame(items).reindex(columns=_RAW_PRICE_COLUMNS)
+            for col in _BLANK_AS_ZERO_COLUMNS:
+                raw[col] = raw[col].where(raw[col].notna() & (raw[col] != ''), 0)
+            
+            # 숫자로 변환할 수 없는 값(빈 값 포함)이 있는 행은 0으로 채우지 않고 건너뜀
+            numeric = raw[_NUMERIC_RAW_COLUMNS].apply(pd.to_numeric, errors='coerce')
+            valid = numeric.notna().all(axis=1)
+            if not valid.all():
+                logger.warning(f"데이터 변환 중 오류 발생 (항목 {int((~valid).sum())}개 건너뜀): {stock_code}")
+                raw = raw[valid]
+                numeric = numeric[valid]
+            
+            df = pd.DataFrame({'거래일': raw['stck_bsop_date'].fillna('')})  # 거래일자
+            df.insert(0, '종목코드', stock_code)
+            df.insert(1, '종목명', stock_name)
+            
+            # 시가/고가/저가/종가/거래량/거래대금
+            for src, dst in _INT_PRICE_FIELDS:
+                df[dst] = numeric[src].astype('int64')
+            
+            df['등락률'] = numeric['prdy_ctrt'].astype('float64')
+            df['수정주가여부'] = (raw['prtt_rate'].fillna('1.00') != '1.00').map({True: '수정', False: '원주가'})
+            
+            # 회전율 - 별도로 계산 또는 추가 정보에서 가져옴
+            if 'vol_tnrt' in additional_info:
+                df['회전율'] = float(additional_info.get('vol_tnrt', 0) or 0)
+            else:
+                df['회전율'] = 0.0
             
             # 날짜 기준으로 오름차순 정렬
-            price_data.sort(key=lambda x: x['거래일'])
+            df.sort_values('거래일', inplace=True, kind='stable')
+            price_data = df.to_dict('records')
             
         except Exception as e:
             logger.error(f"주가 데이터 표준화 중 오류 발생: {str(e)}")
         
         return price_data
     
-    def save_data(self, data, stock_code, stock_name=None, period='D', file_suffix=""):
-        """주가 데이터 파일 저장 (CSV 파일만 생성)"""
+    @staticmethod
+    def _write_parquet(df, file_path):
+        """DataFrame을 Parquet 파일로 저장 (pyarrow 필요, API 서버와 같은 시세 스키마 사용)"""
+        dtypes = {col: dtype for col, dtype in PRICE_PANDAS_DTYPES.items() if col in df.columns}
+        df.astype(dtypes).to_parquet(file_path, engine='pyarrow', compression=PARQUET_COMPRESSION, index=False)
+    
+    def save_data(self, data, stock_code, stock_name=None, period='D', file_suffix="", file_format='csv'):
+        """주가 데이터 파일 저장 (CSV 또는 Parquet)"""
         if not data:
             logger.warning(f"저장할 주가 데이터가 없습니다: {stock_code}")
             return
@@ -255,16 +318,20 @@ class PriceDataCollector:
         period_name = {'D': '일봉', 'W': '주봉', 'M': '월봉'}.get(period, '일봉')
         
         # 기간 정보가 있으면 파일명에 포함
-        csv_filename = f"{stock_code}_{stock_name}_{period_name}{file_suffix}.csv"
-        csv_path = stock_dir / csv_filename
+        file_format = file_format.lower()
+        extension = 'parquet' if file_format == 'parquet' else 'csv'
+        file_path = stock_dir / f"{stock_code}_{stock_name}_{period_name}{file_suffix}.{extension}"
         
         try:
             # 데이터프레임 생성
             df = pd.DataFrame(data)
             
-            # CSV로 저장
-            df.to_csv(csv_path, index=False, encoding='utf-8-sig')
-            return csv_path
+            if file_format == 'parquet':
+                self._write_parquet(df, file_path)
+            else:
+                # CSV로 저장
+                df.to_csv(file_path, index=False, encoding='utf-8-sig')
+            return file_path
         
         except Exception as e:
             logger.error(f"주가 데이터 저장 중 오류 발생: {str(e)}")
@@ -282,33 +349,35 @@ class PriceDataCollector:
         
         current_time = datetime.now().strftime('%Y%m%d_%H%M%S')
         
-        if file_format.lower() == 'csv':
-            # 모든 종목 데이터를 하나의 DataFrame으로 통합
-            all_data = []
+        if file_format.lower() in ('csv', 'parquet'):
+            # 종목별 DataFrame에 종목코드 컬럼을 추가 (호출자의 원본 데이터는 수정하지 않음)
+            frames = []
             
             for stock_code, stock_data in data_dict.items():
                 if not stock_data or not isinstance(stock_data, list):
                     logger.warning(f"종목 {stock_code}의 데이터가 비어있거나 잘못된 형식입니다.")
                     continue
-                    
-                # 각 종목 데이터에 종목코드 컬럼 추가
-                for item in stock_data:
-                    item['종목코드'] = stock_code
                 
-                all_data.extend(stock_data)
+                frames.append(pd.DataFrame(stock_data).assign(종목코드=stock_code))
             
-            if not all_data:
+            if not frames:
                 logger.warning("저장할 데이터가 없습니다.")
                 return None
                 
-            # 통합 DataFrame 생성
-            df = pd.DataFrame(all_data)
+            # 모든 종목 데이터를 하나의 DataFrame으로 통합
+            df = pd.concat(frames, ignore_index=True)
             
             # 필요한 경우 날짜 컬럼을 datetime 타입으로 변환
             if '날짜' in df.columns:
                 df['날짜'] = pd.to_datetime(df['날짜'])
                 # 날짜를 인덱스로 설정하지 않고 일반 컬럼으로 유지
             
+            if file_format.lower() == 'parquet':
+                # Parquet 파일로 저장 (컬럼 단위 압축)
+                file_path = save_dir / f'all_price_data_{current_time}.parquet'
+                self._write_parquet(df, file_path)
+                return file_path
+            
             # 파일명 생성 (날짜 기반)
             file_path = save_dir / f'all_price_data_{current_time}.csv'
             
@@ -321,18 +390,16 @@ class PriceDataCollector:
             # JSON 파일로 저장
             file_path = save_dir / f'all_price_data_{current_time}.json'
             
-            # 종목코드를 포함하는 형태로 데이터 구조 변경
-            formatted_data = []
-            for stock_code, stock_data in data_dict.items():
-                if not stock_data or not isinstance(stock_data, list):
-                    continue
-                    
-                for item in stock_data:
-                    item['종목코드'] = stock_code
-                    formatted_data.append(item)
+            # 종목코드를 포함하는 형태로 데이터 구조 변경 (원본 항목은 복사하여 수정하지 않음)
+            formatted_data = [
+                {**item, '종목코드': stock_code}
+                for stock_code, stock_data in data_dict.items()
+                if stock_data and isinstance(stock_data, list)
+                for item in stock_data
+            ]
             
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(formatted_data, f, ensure_ascii=False, indent=2)
+            with open(file_path, 'wb') as f:
+                f.write(json_codec.dumps(formatted_data, indent=True))
             
             return file_path
             
@@ -350,35 +417,52 @@ class PriceDataCollector:
         save_dir = self.data_path / 'price_data'
         save_dir.mkdir(parents=True, exist_ok=True)
         
-        saved_files = []
+        file_format = file_format.lower()
+        if file_format not in ('csv', 'parquet', 'json'):
+            logger.error(f"지원하지 않는 파일 형식입니다: {file_format}")
+            return None
         
-        for stock_code, stock_data in data_dict.items():
-            if not stock_data:
-                logger.warning(f"종목 {stock_code}의 저장할 데이터가 없습니다.")
-                continue
-            
-            if file_format.lower() == 'csv':
-                # CSV 파일로 저장
-                df = pd.DataFrame(stock_data)
-                
-                # 날짜 컬럼을 datetime 타입으로 변환
-                if '날짜' in df.columns:
-                    df['날짜'] = pd.to_datetime(df['날짜'])
-                    df.set_index('날짜', inplace=True)
-                    df.sort_index(inplace=True)
-                
-                file_path = save_dir / f'{stock_code}_price.csv'
-                df.to_csv(file_path, encoding='utf-8-sig')
-                saved_files.append(file_path)
+        # 종목별 파일 쓰기는 서로 독립적이므로 스레드로 동시에 수행 (입력 순서대로 결과 반환)
+        items = list(data_dict.items())
+        with ThreadPoolExecutor(max_workers=min(16, len(items))) as executor:
+            results = executor.map(
+                lambda item: self._write_individual_file(save_dir, item[0], item[1], file_format),
+                items
+            )
+            saved_files = [file_path for file_path in results if file_path is not None]
+        
+        return saved_files if saved_files else None
+    
+    def _write_individual_file(self, save_dir, stock_code, stock_data, file_format):
+        """종목 하나의 데이터를 파일로 저장 (저장한 파일 경로 반환)"""
+        if not stock_data:
+            logger.warning(f"종목 {stock_code}의 저장할 데이터가 없습니다.")
+            return None
+        
+        if file_format == 'csv':
+            # CSV 파일로 저장
+            df = pd.DataFrame(stock_data)
             
-            elif file_format.lower() == 'json':
-                # JSON 파일로 저장
-                file_path = save_dir / f'{stock_code}_price.json'
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    json.dump(stock_data, f, ensure_ascii=False, indent=2)
-                saved_files.append(file_path)
+            # 날짜 컬럼을 datetime 타입으로 변환
+            if '날짜' in df.columns:
+                df['날짜'] = pd.to_datetime(df['날짜'])
+                df.set_index('날짜', inplace=True)
+                df.sort_index(inplace=True)
             
-            else:
-                logger.error(f"지원하지 않는 파일 형식입니다: {file_format}")
+            file_path = save_dir / f'{stock_code}_price.csv'
+            # 큰 버퍼로 열어 작은 쓰기 호출을 모아서 기록
+            with open(file_path, 'w', encoding='utf-8-sig', newline='', buffering=_WRITE_BUFFER_SIZE) as f:
+                df.to_csv(f)
+            return file_path
+        
+        if file_format == 'parquet':
+            # Parquet 파일로 저장
+            file_path = save_dir / f'{stock_code}_price.parquet'
+            self._write_parquet(pd.DataFrame(stock_data), file_path)
+            return file_path
         
-        return saved_files if saved_files else None
\ No newline at end of file
+        # JSON 파일로 저장
+        file_path = save_dir / f'{stock_code}_price.json'
+        with open(file_path, 'wb', buffering=_WRITE_BUFFER_SIZE) as f:
+            f.write(json_codec.dumps(stock_data, indent=True))
+        return file_path
\ No newline at end of file
@@ -1,11 +1,17 @@
-import json
-import pandas as pd
+import csv
 import os
+import shutil
 from datetime import datetime
+from operator import itemgetter
 from pathlib import Path
 from loguru import logger
 
 from config.settings import DATA_PATH
+from utils import json_codec
+
+# 표준 형식으로 남길 종목 필드
+_STOCK_FIELDS = ('code', 'name')
+_get_code_name = itemgetter(*_STOCK_FIELDS)
 
 
 class StockListCollector:
@@ -31,8 +37,11 @@ class StockListCollector:
                 raw_data = self.api_client.get_stock_list(market_type)
                 
                 if raw_data:
-                    # 응답 데이터 로깅 (디버깅용)
-                    logger.debug(f"API 응답: {json.dumps(raw_data, ensure_ascii=False)[:300]}...")
+                    # 응답 데이터 로깅 (디버깅용, 디버그 레벨일 때만 직렬화)
+                    logger.opt(lazy=True).debug(
+                        "API 응답: {}...",
+                        lambda: json_codec.dumps(raw_data)[:300].decode('utf-8', errors='ignore')
+                    )
                     
                     # 데이터 표준화
                     stocks = self.standardize_data(raw_data, market_type)
@@ -48,14 +57,8 @@ class StockListCollector:
             except Exception as e:
                 logger.error(f"시장 {market_type} 종목 목록 수집 중 오류 발생: {str(e)}")
         
-        # 중복 제거
-        unique_stocks = []
-        unique_codes = set()
-        
-        for stock in all_stocks:
-            if stock['code'] not in unique_codes:
-                unique_codes.add(stock['code'])
-                unique_stocks.append(stock)
+        # 중복 제거 (종목코드 기준, 처음 등장한 순서 유지)
+        unique_stocks = list({stock['code']: stock for stock in all_stocks}.values())
         
         logger.info(f"전체 {len(unique_stocks)}개 종목 수집 완료 (중복 제거 후)")
         
@@ -68,23 +71,30 @@ class StockListCollector:
     def _load_latest_stock_list(self):
         """가장 최근에 저장된 종목 리스트 파일 로드"""
         try:
-            # 최신 파일 확인
+            # 최신 파일 확인 (exists() 확인 없이 바로 읽고, 없으면 날짜 파일 탐색)
             latest_file = self.data_path / "stock_list_latest.json"
-            if latest_file.exists():
-                with open(latest_file, 'r', encoding='utf-8') as f:
-                    stocks = json.load(f)
+            try:
+                stocks = json_codec.loads(latest_file.read_bytes())
                 logger.info(f"최신 종목 리스트 파일 로드 성공: {latest_file}")
                 return stocks
+            except FileNotFoundError:
+                pass
             
-            # 없으면 가장 최근 날짜 파일 찾기
-            json_files = list(self.data_path.glob("stock_list_*.json"))
-            if json_files:
-                latest_file = max(json_files, key=lambda x: x.stat().st_mtime)
-                with open(latest_file, 'r', encoding='utf-8') as f:
-                    stocks = json.load(f)
+            # 없으면 가장 최근 날짜 파일 찾기 (scandir 한 번으로 이름 필터와 stat 처리)
+            with os.scandir(self.data_path) as it:
+                candidates = [
+                    (entry.stat().st_mtime, entry.path)
+                    for entry in it
+                    if entry.name.startswith("stock_list_") and entry.name.endswith(".json")
+                ]
+            if candidates:
+                latest_file = Path(max(candidates)[1])
+                stocks = json_codec.loads(latest_file.read_bytes())
                 logger.info(f"최근 종목 리스트 파일 로드 성공: {latest_file}")
                 return stocks
         
+        except json_codec.JSONDecodeError as e:
+            logger.error(f"저장된 종목 리스트 파싱 실패: {latest_file} - {str(e)}")
         except Exception as e:
             logger.error(f"저장된 종목 리스트 로드 실패: {str(e)}")
         
@@ -93,8 +103,6 @@ class StockListCollector:
     def standardize_data(self, api_response, market_type):
         """API 응답 데이터를 표준 형식으로 변환"""
         try:
-            standardized_data = []
-            
             # 응답에 list 필드가 없으면 빈 리스트 반환
             if 'list' not in api_response:
                 logger.error(f"API 응답에 'list' 필드가 없습니다: {api_response}")
@@ -105,62 +113,78 @@ class StockListCollector:
             # 코스피(거래소)인 경우, marketName이 '거래소'인 종목만 필터링
             if market_type == 0:  # 코스피
                 logger.info("코스피(거래소) 종목만 필터링합니다.")
-                filtered_list = [
-                    {'code': item['code'], 'name': item['name']} 
-                    for item in stock_list 
-                    if item.get('marketName') == '거래소'
+                standardized_data = [
+                    dict(zip(_STOCK_FIELDS, _get_code_name(item)))
+                    for item in stock_list if item.get('marketName') == '거래소'
                 ]
             # 코스닥인 경우 모든 종목 코드 수집
             else:
                 logger.info("코스닥 종목 코드를 수집합니다.")
-                filtered_list = [
-                    {'code': item['code'], 'name': item['name']} 
-                    for item in stock_list
-                ]
+                standardized_data = [dict(zip(_STOCK_FIELDS, _get_code_name(item))) for item in stock_list]
             
-            logger.info(f"수집된 종목 수: {len(filtered_list)}")
-            return filtered_list
+            logger.info(f"수집된 종목 수: {len(standardized_data)}")
+            return standardized_data
             
         except Exception as e:
             logger.error(f"데이터 표준화 중 오류 발생: {str(e)}")
-            logger.debug(f"원본 API 응답: {api_response}")
+            logger.opt(lazy=True).debug("원본 API 응답: {}", lambda: str(api_response))
             return []
     
+    @staticmethod
+    def _write_csv(path, rows):
+        """종목 리스트를 CSV로 저장 (중간 DataFrame 없이 행 단위로 기록, Excel용 BOM 포함)"""
+        # 컬럼은 처음 등장한 키 순서대로 (없는 값은 빈 칸)
+        fieldnames = list(dict.fromkeys(key for row in rows for key in row))
+        with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(rows)
+    
+    @staticmethod
+    def _tmp_path(path):
+        """같은 디렉토리의 임시 파일 경로 반환 (os.replace로 원자적 교체용)"""
+        return path.with_name(path.name + '.tmp')
+    
+    def _publish_latest(self, src_path, latest_path):
+        """최신 데이터 파일을 원자적으로 교체 (하드 링크 우선, 실패 시 파일 복사)"""
+        tmp_path = self._tmp_path(latest_path)
+        if tmp_path.exists():
+            tmp_path.unlink()
+        
+        try:
+            # 하드 링크는 데이터를 복사하지 않음
+            os.link(src_path, tmp_path)
+        except OSError as e:
+            logger.warning(f"하드 링크 생성 실패, 파일 복사로 대체: {str(e)}")
+            shutil.copyfile(src_path, tmp_path)
+        
+        # 기존 최신 파일(또는 링크)을 지우지 않고 한 번에 교체
+        os.replace(tmp_path, latest_path)
+    
     def save_data(self, data):
         """데이터 파일 저장"""
         today = datetime.now().strftime('%Y%m%d')
         file_path = self.data_path / f"stock_list_{today}.json"
         
         try:
-            # JSON 형식으로 저장
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            # JSON 형식으로 저장 (임시 파일에 쓴 뒤 교체하여 중간에 실패해도 기존 파일 유지)
+            tmp_path = self._tmp_path(file_path)
+            with open(tmp_path, 'wb') as f:
+                f.write(json_codec.dumps(data, indent=True))
+            os.replace(tmp_path, file_path)
             
             # CSV 형식으로도 저장
             csv_path = self.data_path / f"stock_list_{today}.csv"
-            pd.DataFrame(data).to_csv(csv_path, index=False, encoding='utf-8-sig')
+            tmp_path = self._tmp_path(csv_path)
+            self._write_csv(tmp_path, data)
+            os.replace(tmp_path, csv_path)
             
             logger.info(f"종목 리스트 저장 완료: {file_path}")
             logger.info(f"종목 리스트 CSV 저장 완료: {csv_path}")
             
-            # 최신 데이터 링크 생성
-            latest_json = self.data_path / "stock_list_latest.json"
-            latest_csv = self.data_path / "stock_list_latest.csv"
-            
-            if latest_json.exists():
-                latest_json.unlink()
-            if latest_csv.exists():
-                latest_csv.unlink()
-            
-            try:
-                latest_json.symlink_to(file_path.name)
-                latest_csv.symlink_to(csv_path.name)
-            except Exception as e:
-                # 심볼릭 링크 생성 실패 시 파일 복사로 대체
-                logger.warning(f"심볼릭 링크 생성 실패, 파일 복사로 대체: {str(e)}")
-                import shutil
-                shutil.copy2(file_path, latest_json)
-                shutil.copy2(csv_path, latest_csv)
+            # 최신 데이터 파일 갱신
+            self._publish_latest(file_path, self.data_path / "stock_list_latest.json")
+            self._publish_latest(csv_path, self.data_path / "stock_list_latest.csv")
             
         except Exception as e:
             logger.error(f"데이터 저장 중 오류 발생: {str(e)}")
\ No newline at end of file
@@ -18,6 +18,12 @@ KIS_APP_SECRET = os.getenv('KIS_APP_SECRET')
 KIWOOM_API_HOST = 'https://api.kiwoom.com'
 KIS_API_HOST = 'https://openapi.koreainvestment.com:9443'
 
+# API 호출 제한 (초당 요청 수, 실전 계좌 기준 20 / 모의투자 2)
+KIS_REQUESTS_PER_SECOND = int(os.getenv('KIS_REQUESTS_PER_SECOND', 20))
+
+# 시세 수집 최대 동시 요청 수 (네트워크 대기 위주 작업이므로 CPU 코어 수와 무관하게 설정)
+KIS_CONCURRENCY = max(1, int(os.getenv('KIS_CONCURRENCY', 32)))
+
 # 토큰 설정
 TOKEN_STORAGE_PATH = Path('config/tokens')
 TOKEN_STORAGE_PATH.mkdir(parents=True, exist_ok=True)
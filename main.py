@@ -1,24 +1,26 @@
 import os
 import sys
 import json
-import csv
 import time
 import argparse
-import multiprocessing as mp
-from concurrent.futures import ProcessPoolExecutor, as_completed
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from functools import partial
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+import pandas as pd
 from loguru import logger
 
 # 환경 설정 및 로깅 설정
 from config.settings import (
     KIWOOM_APP_KEY, KIWOOM_APP_SECRET,
-    KIS_APP_KEY, KIS_APP_SECRET,
+    KIS_APP_KEY, KIS_APP_SECRET, KIS_CONCURRENCY,
     DATA_PATH
 )
 
 # API 클라이언트 및 토큰 관리
 from api.token_manager import KiwoomTokenManager, KoreaInvestmentTokenManager, TokenFailedException
+from api.base_client import FatalTokenError
+from api.http_session import create_session
 from api.kiwoom_client import KiwoomAPIClient
 from api.korea_investment_client import KoreaInvestmentAPIClient
 from utils.error_handler import APIErrorHandler
@@ -99,7 +101,7 @@ def get_stock_list_from_kiwoom():
         logger.info(f"총 {len(all_stocks)}개 종목 정보 가져오기 완료")
         return all_stocks
         
-    except TokenFailedException as e:
+    except (TokenFailedException, FatalTokenError) as e:
         # 토큰 발급 실패 시 프로그램 종료
         logger.critical(f"치명적 오류: {str(e)}")
         sys.exit(1)  # 비정상 종료 코드로 프로그램 종료
@@ -109,50 +111,97 @@ def get_stock_list_from_kiwoom():
         return []
 
 
+# 시세 수집 최대 동시 작업 수 (공유 세션의 커넥션 풀 크기와 동일하게 유지)
+MAX_PRICE_WORKERS = KIS_CONCURRENCY
+
+# 워커 스레드별로 재사용하는 API 클라이언트와 에러 핸들러 (워커 초기화 시 생성)
+_worker_local = threading.local()
+
+# 모든 워커 스레드가 공유하는 토큰 매니저와 커넥션 풀 세션 (처음 필요할 때 생성)
+_shared_lock = threading.Lock()
+_shared_token_manager = None
+_shared_session = None
+
+
+def _get_shared_kis_resources():
+    """워커 스레드가 공유하는 한국투자증권 토큰 매니저와 세션 반환 (없으면 생성)"""
+    global _shared_token_manager, _shared_session
+    with _shared_lock:
+        if _shared_token_manager is None:
+            # 토큰 매니저 생성 - 실패 시 예외 발생
+            _shared_token_manager = KoreaInvestmentTokenManager(KIS_APP_KEY, KIS_APP_SECRET)
+        if _shared_session is None:
+            # 하나의 커넥션 풀에서 keep-alive 커넥션을 스레드 간에 재사용
+            _shared_session = create_session(pool_connections=1, pool_maxsize=MAX_PRICE_WORKERS)
+        return _shared_token_manager, _shared_session
+
+
+def _get_worker_client():
+    """현재 워커 스레드의 API 클라이언트와 에러 핸들러 반환 (없으면 생성)"""
+    client = getattr(_worker_local, 'client', None)
+    if client is None:
+        token_manager, session = _get_shared_kis_resources()
+        client = _worker_local.client = KoreaInvestmentAPIClient(token_manager, session=session)
+        _worker_local.error_handler = APIErrorHandler()
+    return client, _worker_local.error_handler
+
+
+def _init_price_worker():
+    """시세 수집 워커 스레드 초기화 (스레드당 한 번 API 클라이언트 생성)"""
+    try:
+        _get_worker_client()
+    except Exception as e:
+        # 초기화 함수에서 예외가 나면 스레드 풀 전체가 중단되므로,
+        # 여기서는 기록만 하고 첫 작업에서 다시 생성하며 오류를 전파
+        logger.error(f"워커 초기화 실패: {str(e)}")
+
+
+def _fetch_daily_price(client, error_handler, stock_code, stock_name, start_date, end_date):
+    """종목의 일별 시세를 조회하여 종목코드/종목명 컬럼을 추가한 DataFrame 반환 (데이터가 없으면 None)"""
+    # 시세 정보 가져오기
+    price_data = error_handler.handle_request(
+        client.get_daily_price,
+        stock_code=stock_code,
+        period='D',  # 일별 데이터
+        is_adjusted=True,  # 수정주가 적용
+        start_date=start_date,
+        end_date=end_date
+    )
+    
+    # 결과 검증 및 처리
+    if 'error' in price_data:
+        logger.error(f"API 오류 ({stock_code}): {price_data['error']}")
+        return None
+        
+    # 결과 처리 (종목코드와 종목명은 컬럼 단위로 추가)
+    output = price_data.get('output2')
+    if isinstance(output, list) and output:
+        df = pd.DataFrame(output)
+        df['종목코드'] = stock_code
+        df['종목명'] = stock_name or ''
+        # 상세 로그는 디버그 레벨로 변경
+        logger.debug("종목 {} 시세 {}개 데이터 조회 완료", stock_code, len(df))
+        return df
+    
+    logger.debug("종목 {} 시세 데이터가 없습니다", stock_code)
+    return None
+
+
 def collect_price_data(stock_data, start_date, end_date):
-    """개별 종목의 시세 데이터 수집 (멀티프로세싱용)"""
+    """개별 종목의 시세 데이터 수집 (워커 스레드용)"""
     stock_code = stock_data.get('code')
-    stock_name = stock_data.get('name')
     
     if not stock_code:
         return None
     
     try:
-        # 토큰 매니저 생성
-        token_manager = KoreaInvestmentTokenManager(KIS_APP_KEY, KIS_APP_SECRET)
-        
-        # API 클라이언트 생성
-        client = KoreaInvestmentAPIClient(token_manager)
-        
-        # 에러 핸들러 생성
-        error_handler = APIErrorHandler()
-        
-        # 시세 정보 가져오기
-        price_data = error_handler.handle_request(
-            client.get_daily_price,
-            stock_code=stock_code,
-            period='D',
-            is_adjusted=True,
-            start_date=start_date,
-            end_date=end_date
-        )
-        
-        # 결과 검증 및 처리
-        if 'error' in price_data:
-            return None
-            
-        # 결과 처리
-        result = []
-        if 'output2' in price_data and isinstance(price_data['output2'], list):
-            # 각 항목에 종목코드와 종목명 추가
-            for item in price_data['output2']:
-                item['종목코드'] = stock_code
-                item['종목명'] = stock_name or ''
-            result = price_data['output2']
-            return result
-        else:
-            return None
+        # 워커 스레드에서 재사용하는 API 클라이언트 및 에러 핸들러
+        client, error_handler = _get_worker_client()
+        return _fetch_daily_price(client, error_handler, stock_code, stock_data.get('name'), start_date, end_date)
             
+    except (TokenFailedException, FatalTokenError):
+        # 토큰 오류는 메인 스레드로 전파하여 전체 작업을 중단
+        raise
     except Exception:
         return None
 
@@ -160,7 +209,7 @@ def collect_price_data(stock_data, start_date, end_date):
 def get_stock_price_from_kis(stock_code, stock_name=None, start_date=None, end_date=None):
     """한국투자증권 API를 통해 종목별 시세 가져오기"""
     # 상세 로그는 디버그 레벨로 변경
-    logger.debug(f"종목 {stock_code}({stock_name}) 시세 요청 중...")
+    logger.debug("종목 {}({}) 시세 요청 중...", stock_code, stock_name)
     
     try:
         # 입력값 검증
@@ -168,46 +217,13 @@ def get_stock_price_from_kis(stock_code, stock_name=None, start_date=None, end_d
             logger.error(f"유효하지 않은 종목코드: {stock_code}")
             return []
             
-        # 토큰 매니저 생성 - 실패 시 예외 발생
-        token_manager = KoreaInvestmentTokenManager(KIS_APP_KEY, KIS_APP_SECRET)
+        # 현재 스레드의 API 클라이언트 재사용 (없으면 생성, 토큰 발급 실패 시 예외 발생)
+        client, error_handler = _get_worker_client()
         
-        # API 클라이언트 생성
-        client = KoreaInvestmentAPIClient(token_manager)
-        
-        # 에러 핸들러 생성
-        error_handler = APIErrorHandler()
+        df = _fetch_daily_price(client, error_handler, stock_code, stock_name, start_date, end_date)
+        return df.to_dict('records') if df is not None else []
         
-        # 시세 정보 가져오기
-        price_data = error_handler.handle_request(
-            client.get_daily_price,
-            stock_code=stock_code,
-            period='D',  # 일별 데이터
-            is_adjusted=True,  # 수정주가 적용
-            start_date=start_date,
-            end_date=end_date
-        )
-        
-        # 결과 검증 및 처리
-        if 'error' in price_data:
-            logger.error(f"API 오류 ({stock_code}): {price_data['error']}")
-            return []
-            
-        # 결과 처리
-        result = []
-        if 'output2' in price_data and isinstance(price_data['output2'], list):
-            # 각 항목에 종목코드와 종목명 추가
-            for item in price_data['output2']:
-                item['종목코드'] = stock_code
-                item['종목명'] = stock_name or ''
-            result = price_data['output2']
-            # 상세 로그는 디버그 레벨로 변경
-            logger.debug(f"종목 {stock_code} 시세 {len(result)}개 데이터 조회 완료")
-        else:
-            logger.debug(f"종목 {stock_code} 시세 데이터가 없습니다")
-        
-        return result
-        
-    except TokenFailedException as e:
+    except (TokenFailedException, FatalTokenError) as e:
         # 토큰 발급 실패 시 프로그램 종료
         logger.critical(f"치명적 오류: {str(e)}")
         sys.exit(1)  # 비정상 종료 코드로 프로그램 종료
@@ -217,6 +233,43 @@ def get_stock_price_from_kis(stock_code, stock_name=None, start_date=None, end_d
         return []
 
 
+# 시세 CSV 필드명 매핑 (영어 -> 한글)
+PRICE_FIELD_MAPPING = {
+    'stck_bsop_date': '날짜',
+    'stck_clpr': '종가',
+    'stck_oprc': '시가',
+    'stck_hgpr': '고가',
+    'stck_lwpr': '저가',
+    'acml_vol': '거래량',
+    'acml_tr_pbmn': '거래대금',
+    'flng_cls_code': '락구분',
+    'prtt_rate': '분할비율',
+    '종목코드': '종목코드',
+    '종목명': '종목명'
+}
+
+# 시세 CSV 필드 순서
+PRICE_FIELD_ORDER = [
+    '종목코드', '종목명', '날짜', '시가', '고가', 
+    '저가', '종가', '거래량', '거래대금', '락구분', '분할비율'
+]
+
+
+def _price_data_frame(price_data):
+    """영어 필드명을 한글로 변환하고 필드 순서대로 정렬한 DataFrame 생성 (리스트 또는 DataFrame, 없는 필드는 빈 값)"""
+    return pd.DataFrame(price_data).rename(columns=PRICE_FIELD_MAPPING).reindex(columns=PRICE_FIELD_ORDER)
+
+
+def write_price_csv_header(f):
+    """시세 CSV 헤더 쓰기"""
+    pd.DataFrame(columns=PRICE_FIELD_ORDER).to_csv(f, index=False)
+
+
+def append_price_data_to_csv(f, price_data):
+    """열린 CSV 파일에 시세 데이터 행 추가 (헤더 제외)"""
+    _price_data_frame(price_data).to_csv(f, index=False, header=False)
+
+
 def save_price_data_to_csv(price_data, filename):
     """시세 데이터를 CSV 파일로 저장"""
     if not price_data:
@@ -227,44 +280,8 @@ def save_price_data_to_csv(price_data, filename):
         # 디렉토리 생성
         os.makedirs(os.path.dirname(filename), exist_ok=True)
         
-        # 필드명 매핑 (영어 -> 한글)
-        field_mapping = {
-            'stck_bsop_date': '날짜',
-            'stck_clpr': '종가',
-            'stck_oprc': '시가',
-            'stck_hgpr': '고가',
-            'stck_lwpr': '저가',
-            'acml_vol': '거래량',
-            'acml_tr_pbmn': '거래대금',
-            'flng_cls_code': '락구분',
-            'prtt_rate': '분할비율',
-            '종목코드': '종목코드',
-            '종목명': '종목명'
-        }
-        
-        # 필드 순서 정의
-        field_order = [
-            '종목코드', '종목명', '날짜', '시가', '고가', 
-            '저가', '종가', '거래량', '거래대금', '락구분', '분할비율'
-        ]
-        
         # CSV 파일로 저장
-        with open(filename, 'w', encoding='utf-8-sig', newline='') as f:
-            # 헤더 준비
-            writer = csv.DictWriter(f, fieldnames=field_order)
-            writer.writeheader()
-            
-            # 데이터 변환 및 저장
-            for item in price_data:
-                # 영어 필드명을 한글로 변환
-                korean_item = {}
-                for eng_key, value in item.items():
-                    if eng_key in field_mapping:
-                        korean_key = field_mapping[eng_key]
-                        korean_item[korean_key] = value
-                
-                # 변환된 데이터 쓰기
-                writer.writerow(korean_item)
+        _price_data_frame(price_data).to_csv(filename, index=False, encoding='utf-8-sig')
         
         logger.info(f"시세 데이터 CSV 저장 완료: {filename} ({len(price_data)}개 항목)")
         return True
@@ -273,6 +290,13 @@ def save_price_data_to_csv(price_data, filename):
         return False
 
 
+def _parse_yyyymmdd(value):
+    """YYYYMMDD 형식 문자열을 date로 변환 (형식이 잘못되면 ValueError)"""
+    if len(value) != 8 or not value.isdigit():
+        raise ValueError(f"잘못된 날짜 형식: {value}")
+    return date(int(value[:4]), int(value[4:6]), int(value[6:8]))
+
+
 def parse_arguments():
     """명령줄 인수 파싱"""
     parser = argparse.ArgumentParser(description='주식 시세 데이터 수집 프로그램')
@@ -306,15 +330,15 @@ def main():
         
         logger.info("주식 시세 데이터 수집 프로그램 시작")
         
-        # 날짜 설정
-        today = datetime.now().strftime('%Y%m%d')
-        default_start_date = (datetime.now() - timedelta(days=30)).strftime('%Y%m%d')
+        # 날짜 설정 (각 날짜는 한 번만 파싱하여 비교에 재사용)
+        today_dt = date.today()
+        default_start_dt = today_dt - timedelta(days=30)
         
         # 단일 날짜 인수가 있으면 시작일과 종료일로 설정
         if args.date:
             try:
                 # 날짜 형식 검증
-                datetime.strptime(args.date, '%Y%m%d')
+                start_dt = end_dt = _parse_yyyymmdd(args.date)
                 start_date = args.date
                 end_date = args.date
                 logger.info(f"수집 날짜: {args.date}")
@@ -326,28 +350,30 @@ def main():
             if args.start_date:
                 try:
                     # 날짜 형식 검증
-                    datetime.strptime(args.start_date, '%Y%m%d')
+                    start_dt = _parse_yyyymmdd(args.start_date)
                     start_date = args.start_date
                 except ValueError:
                     logger.error(f"잘못된 시작일 형식: {args.start_date} (YYYYMMDD 형식으로 입력해주세요)")
                     return
             else:
-                start_date = default_start_date
+                start_dt = default_start_dt
+                start_date = default_start_dt.strftime('%Y%m%d')
             
             # 종료일 설정
             if args.end_date:
                 try:
                     # 날짜 형식 검증
-                    datetime.strptime(args.end_date, '%Y%m%d')
+                    end_dt = _parse_yyyymmdd(args.end_date)
                     end_date = args.end_date
                 except ValueError:
                     logger.error(f"잘못된 종료일 형식: {args.end_date} (YYYYMMDD 형식으로 입력해주세요)")
                     return
             else:
-                end_date = today
+                end_dt = today_dt
+                end_date = today_dt.strftime('%Y%m%d')
         
         # 날짜 유효성 검사 (시작일이 종료일보다 늦지 않도록)
-        if datetime.strptime(start_date, '%Y%m%d') > datetime.strptime(end_date, '%Y%m%d'):
+        if start_dt > end_dt:
             logger.error(f"시작일({start_date})이 종료일({end_date})보다 늦습니다.")
             return
         
@@ -361,7 +387,7 @@ def main():
             return
         
         # 2. 한국투자증권에서 종목별 시세 가져오기
-        all_price_data = []
+        total_rows = 0
         success_count = 0
         fail_count = 0
         
@@ -370,10 +396,9 @@ def main():
         # 최대 처리 종목 수 설정
         max_stocks = args.max_stocks
         
-        # 병렬 처리 설정
-        max_workers = mp.cpu_count() - 1  # CPU 코어 수 - 1 (최소 1)
-        max_workers = max(1, max_workers)
-        logger.info(f"병렬 처리 사용: {max_workers}개 프로세스")
+        # 병렬 처리 설정 (네트워크 대기가 대부분이므로 CPU 코어 수가 아닌 배치 크기 기준)
+        max_workers = max(1, min(MAX_PRICE_WORKERS, args.batch_size * 2))
+        logger.info(f"병렬 처리 사용: {max_workers}개 스레드")
         
         # 처리할 종목 제한
         if max_stocks:
@@ -390,40 +415,68 @@ def main():
         start_time = time.time()
         
         # 프로그레스바 초기화
-        print_progress_bar(0, len(stock_list), prefix='진행률:', suffix='', length=40)
+        total_stocks = len(stock_list)
+        print_progress_bar(0, total_stocks, prefix='진행률:', suffix='', length=40)
         
         completed = 0
+        last_draw = 0.0  # 마지막으로 프로그레스 바를 그린 시각 (monotonic)
         
-        # 배치 단위로 처리
-        for batch_idx in range(total_batches):
-            batch_start = batch_idx * batch_size
-            batch_end = min(batch_start + batch_size, len(stock_list))
-            current_batch = stock_list[batch_start:batch_end]
-            
-            # 병렬 처리 준비
-            collect_with_dates = partial(collect_price_data, start_date=start_date, end_date=end_date)
+        # 병렬 처리 준비
+        collect_with_dates = partial(collect_price_data, start_date=start_date, end_date=end_date)
+        
+        # 워커가 공유할 토큰 매니저를 미리 생성 (실패 시 종목마다 토큰 발급을 재시도하지 않고 종료)
+        _get_shared_kis_resources()
+        
+        # 결과는 메모리에 모으지 않고 종목별로 완료되는 즉시 CSV 파일에 추가
+        # (단일 날짜인 경우 파일명에 표시)
+        if start_date == end_date:
+            date_suffix = f"{start_date}"
+        else:
+            date_suffix = f"{start_date}_to_{end_date}"
+        csv_filename = f"{DATA_PATH}/stock_prices_{date_suffix}.csv"
+        os.makedirs(os.path.dirname(csv_filename), exist_ok=True)
+        
+        # 스레드 풀은 한 번만 만들고 모든 배치에서 재사용 (워커별 API 클라이언트 유지)
+        with open(csv_filename, 'w', encoding='utf-8-sig', newline='') as csv_file, \
+                ThreadPoolExecutor(max_workers=max_workers, initializer=_init_price_worker) as executor:
+            write_price_csv_header(csv_file)
             
-            # 병렬 실행
-            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            # 배치 단위로 처리
+            for batch_idx in range(total_batches):
+                batch_start = batch_idx * batch_size
+                batch_end = min(batch_start + batch_size, len(stock_list))
+                current_batch = stock_list[batch_start:batch_end]
+                
+                # 병렬 실행
                 futures = {executor.submit(collect_with_dates, stock): stock for stock in current_batch}
                 
                 for future in as_completed(futures):
                     stock = futures[future]
                     try:
                         price_data = future.result()
-                        if price_data:
-                            all_price_data.extend(price_data)
+                        if price_data is not None:
+                            append_price_data_to_csv(csv_file, price_data)
+                            total_rows += len(price_data)
                             success_count += 1
                         else:
                             fail_count += 1
+                    except (TokenFailedException, FatalTokenError):
+                        raise
                     except Exception as e:
                         logger.error(f"종목 {stock.get('code')} 데이터 수집 중 오류: {str(e)}")
                         fail_count += 1
                     
                     # 진행 상황 업데이트
                     completed += 1
+                    
+                    # 프로그레스 바는 초당 최대 10번만 다시 그림 (마지막 종목은 항상 표시)
+                    now = time.monotonic()
+                    if now - last_draw < 0.1 and completed < total_stocks:
+                        continue
+                    last_draw = now
+                    
                     elapsed = time.time() - start_time
-                    estimated_total = elapsed / completed * len(stock_list)
+                    estimated_total = elapsed / completed * total_stocks
                     estimated_remaining = estimated_total - elapsed
                     
                     # 예상 종료 시간 계산
@@ -432,33 +485,27 @@ def main():
                     
                     # 진행률 표시
                     suffix = f"남은 시간: {estimated_remaining/60:.1f}분 | 예상 종료: {end_time_str}"
-                    print_progress_bar(completed, len(stock_list), prefix='진행률:', suffix=suffix, length=40)
-            
-            # 배치 간 대기 (API 제한 방지)
-            if batch_idx < total_batches - 1:
-                time.sleep(wait_time)  # 배치 사이 대기
+                    print_progress_bar(completed, total_stocks, prefix='진행률:', suffix=suffix, length=40)
+                
+                # 배치 간 대기 (API 제한 방지)
+                if batch_idx < total_batches - 1:
+                    time.sleep(wait_time)  # 배치 사이 대기
         
         total_time = time.time() - start_time
-        logger.info(f"\n시세 데이터 수집 완료: 성공 {success_count}개, 실패 {fail_count}개, 총 {len(all_price_data)}개 데이터")
+        logger.info(f"\n시세 데이터 수집 완료: 성공 {success_count}개, 실패 {fail_count}개, 총 {total_rows}개 데이터")
         logger.info(f"총 소요 시간: {total_time/60:.1f}분 ({total_time:.1f}초)")
         
-        # 3. 수집된 모든 시세 데이터를 CSV 파일로 저장
-        if all_price_data:
-            # 단일 날짜인 경우 파일명에 표시
-            if start_date == end_date:
-                date_suffix = f"{start_date}"
-            else:
-                date_suffix = f"{start_date}_to_{end_date}"
-                
-            csv_filename = f"{DATA_PATH}/stock_prices_{date_suffix}.csv"
-            save_price_data_to_csv(all_price_data, csv_filename)
-            logger.info(f"모든 주식 시세 데이터 저장 완료: {csv_filename}")
+        # 3. 수집 결과 확인 (시세 데이터는 수집 중에 CSV 파일에 기록됨)
+        if total_rows:
+            logger.info(f"모든 주식 시세 데이터 저장 완료: {csv_filename} ({total_rows}개 항목)")
         else:
+            # 헤더만 있는 빈 파일은 남기지 않음
+            os.remove(csv_filename)
             logger.error("저장할 시세 데이터가 없습니다.")
         
         logger.info("프로그램 정상 종료")
     
-    except TokenFailedException as e:
+    except (TokenFailedException, FatalTokenError) as e:
         # 토큰 발급 실패 시 프로그램 종료
         logger.critical(f"치명적 오류: {str(e)}")
         sys.exit(1)  # 비정상 종료 코드로 프로그램 종료
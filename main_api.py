@@ -1,33 +1,48 @@
 from fastapi import FastAPI, Query, HTTPException, BackgroundTasks, Depends
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import List, Literal, Optional
 import os
 import json
 import csv
+import io
+import queue
 import time
-import multiprocessing as mp
-from concurrent.futures import ProcessPoolExecutor, as_completed
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from functools import partial
+from operator import itemgetter
 from loguru import logger
 import sys
 import uuid
 import asyncio
 
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow 미설치 환경에서는 CSV로만 저장 가능
+    pa = pc = pq = None
+
 # 환경 설정 및 로깅 설정
 from config.settings import (
     KIWOOM_APP_KEY, KIWOOM_APP_SECRET,
-    KIS_APP_KEY, KIS_APP_SECRET,
+    KIS_APP_KEY, KIS_APP_SECRET, KIS_CONCURRENCY,
     DATA_PATH
 )
 
 # API 클라이언트 및 토큰 관리
 from api.token_manager import KiwoomTokenManager, KoreaInvestmentTokenManager, TokenFailedException
+from api.base_client import FatalTokenError
+from api.http_session import create_session
 from api.kiwoom_client import KiwoomAPIClient
 from api.korea_investment_client import KoreaInvestmentAPIClient
 from utils.error_handler import APIErrorHandler
+from utils import json_codec
+from utils.parquet_schema import PARQUET_COMPRESSION, PRICE_NUMERIC_TYPES
 
 # 간단한 로깅 설정
 logger.remove()  # 기본 핸들러 제거
@@ -39,7 +54,9 @@ logger.add("logs/error.log", level="ERROR", rotation="1 day")  # 에러 로그
 app = FastAPI(
     title="주식 시세 데이터 API",
     description="한국 주식 시세 데이터를 수집하는 API입니다. n8n과 연동하여 사용 가능합니다.",
-    version="1.0.0"
+    version="1.0.0",
+    # 작업 상태 폴링 응답은 orjson으로 직렬화 (미설치 시 기본 JSON 응답)
+    default_response_class=ORJSONResponse if json_codec.orjson is not None else JSONResponse
 )
 
 # CORS 미들웨어 설정 (모든 오리진 허용)
@@ -51,8 +68,40 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+class TaskStore(OrderedDict):
+    """작업 상태 저장소 (보관 개수/기간을 넘은 종료 작업은 새 작업 등록 시 오래된 순으로 제거)"""
+    
+    def __init__(self, max_size=1024, ttl=24 * 60 * 60):
+        super().__init__()
+        self.max_size = max_size
+        self.ttl = ttl
+        self._created = {}  # 작업 ID별 등록 시각 (monotonic)
+    
+    def __setitem__(self, task_id, task):
+        super().__setitem__(task_id, task)
+        self._created[task_id] = time.monotonic()
+        self._prune()
+    
+    def __delitem__(self, task_id):
+        super().__delitem__(task_id)
+        self._created.pop(task_id, None)
+    
+    def _prune(self):
+        """보관 기간이 지났거나 최대 개수를 넘은 종료 작업 제거 (진행 중인 작업은 유지)"""
+        expire_before = time.monotonic() - self.ttl
+        for task_id in list(self):
+            if len(self) <= self.max_size and self._created[task_id] >= expire_before:
+                break
+            if self[task_id].get("status") != "processing":
+                del self[task_id]
+
+
 # 활성 작업 상태 관리
-active_tasks = {}
+active_tasks = TaskStore()
+
+
+# 결과 파일 형식 (csv: Excel 호환, parquet: 타입이 지정된 압축 컬럼 형식)
+FileFormat = Literal['csv', 'parquet']
 
 
 # 모델 정의
@@ -60,11 +109,13 @@ class DateRange(BaseModel):
     start_date: str = Field(..., description="수집 시작일 (YYYYMMDD 형식)")
     end_date: str = Field(..., description="수집 종료일 (YYYYMMDD 형식)")
     max_stocks: Optional[int] = Field(None, description="최대 처리 종목 수 (기본값: 전체 종목)")
+    file_format: FileFormat = Field('csv', description="결과 파일 형식 (csv 또는 parquet)")
 
 
 class SingleDate(BaseModel):
     date: str = Field(..., description="수집 날짜 (YYYYMMDD 형식)")
     max_stocks: Optional[int] = Field(None, description="최대 처리 종목 수 (기본값: 전체 종목)")
+    file_format: FileFormat = Field('csv', description="결과 파일 형식 (csv 또는 parquet)")
 
 
 class TaskResponse(BaseModel):
@@ -80,12 +131,77 @@ class TaskStatus(BaseModel):
     progress: Optional[float] = Field(None, description="진행률 (0-100)")
     message: str = Field(..., description="메시지")
     file_path: Optional[str] = Field(None, description="생성된 파일 경로")
+    dataset_path: Optional[str] = Field(None, description="날짜별로 분할된 Parquet 데이터셋 경로 (Parquet 날짜 범위 수집 시)")
     created_at: str = Field(..., description="작업 생성 시간")
     completed_at: Optional[str] = Field(None, description="작업 완료 시간")
 
 
-# 주식 종목 리스트 가져오기
+# 종목 리스트 캐시 유지 시간(초) - 종목 목록은 하루에 한 번 이상 바뀌지 않음
+STOCK_LIST_CACHE_TTL = 12 * 60 * 60
+
+# 종목 리스트 캐시 파일 (서버 재시작 후에도 재사용)
+STOCK_LIST_CACHE_FILE = DATA_PATH / 'stock_list' / 'market_stock_list.json'
+
+# 메모리 캐시 (종목 리스트, 만료 시각(monotonic))
+_stock_list_cache = None
+_stock_list_cache_expires = 0.0
+
+
+def _load_stock_list_cache_file():
+    """캐시 파일이 유효 시간 안에 저장된 경우 종목 리스트와 남은 유효 시간 반환 (없으면 None)"""
+    try:
+        remaining = STOCK_LIST_CACHE_TTL - (time.time() - STOCK_LIST_CACHE_FILE.stat().st_mtime)
+        if remaining <= 0:
+            return None
+        return json_codec.loads(STOCK_LIST_CACHE_FILE.read_bytes()), remaining
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"종목 리스트 캐시 파일 로드 실패: {str(e)}")
+        return None
+
+
+def _save_stock_list_cache_file(stocks):
+    """종목 리스트를 캐시 파일로 저장 (임시 파일에 쓴 뒤 교체)"""
+    try:
+        STOCK_LIST_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = STOCK_LIST_CACHE_FILE.with_name(STOCK_LIST_CACHE_FILE.name + '.tmp')
+        tmp_path.write_bytes(json_codec.dumps(stocks))
+        os.replace(tmp_path, STOCK_LIST_CACHE_FILE)
+    except Exception as e:
+        logger.warning(f"종목 리스트 캐시 파일 저장 실패: {str(e)}")
+
+
 async def get_stock_list():
+    """종목 리스트 가져오기 (메모리 → 캐시 파일 → 키움증권 API 순으로 조회)"""
+    global _stock_list_cache, _stock_list_cache_expires
+    
+    if _stock_list_cache is not None and time.monotonic() < _stock_list_cache_expires:
+        logger.info(f"캐시된 종목 리스트 사용: {len(_stock_list_cache)}개 종목")
+        return list(_stock_list_cache)
+    
+    cached = _load_stock_list_cache_file()
+    if cached:
+        stocks, remaining = cached
+        logger.info(f"종목 리스트 캐시 파일 사용: {len(stocks)}개 종목")
+    else:
+        stocks = await fetch_stock_list()
+        if not stocks:
+            return stocks
+        remaining = STOCK_LIST_CACHE_TTL
+        _save_stock_list_cache_file(stocks)
+    
+    _stock_list_cache = stocks
+    _stock_list_cache_expires = time.monotonic() + remaining
+    return list(stocks)
+
+
+# 종목 리스트 정렬 시 시장 순서
+_MARKET_ORDER = {'KOSPI': 0, 'KOSDAQ': 1}
+
+
+# 주식 종목 리스트 가져오기
+async def fetch_stock_list():
     """키움증권 API를 통해 종목 리스트 가져오기"""
     logger.info("키움증권에서 종목 리스트 가져오기 시작")
     
@@ -101,11 +217,11 @@ async def get_stock_list():
         
         # 코스피 종목 리스트 가져오기 (marketName이 '거래소'인 것만)
         logger.info("코스피 종목 조회 중...")
-        kospi_stocks = error_handler.handle_request(client.get_simple_stock_list, 0)
+        kospi_stocks = await error_handler.handle_request_async(client.get_simple_stock_list, 0)
         
         # 코스닥 종목 리스트 가져오기
         logger.info("코스닥 종목 조회 중...")
-        kosdaq_stocks = error_handler.handle_request(client.get_simple_stock_list, 10)
+        kosdaq_stocks = await error_handler.handle_request_async(client.get_simple_stock_list, 10)
         
         # 결과 합치기
         all_stocks = []
@@ -131,11 +247,20 @@ async def get_stock_list():
         if not all_stocks:
             logger.error("종목 정보를 가져오지 못했습니다")
             return []
+        
+        # 중복 종목코드 제거 (먼저 나온 시장 기준) 후 시장 순서, 종목코드 순으로 정렬
+        unique_stocks = {}
+        for stock in all_stocks:
+            unique_stocks.setdefault(stock.get('code'), stock)
+        all_stocks = sorted(
+            unique_stocks.values(),
+            key=lambda stock: (_MARKET_ORDER.get(stock.get('market'), len(_MARKET_ORDER)), stock.get('code') or '')
+        )
             
         logger.info(f"총 {len(all_stocks)}개 종목 정보 가져오기 완료")
         return all_stocks
         
-    except TokenFailedException as e:
+    except (TokenFailedException, FatalTokenError) as e:
         logger.critical(f"치명적 오류: {str(e)}")
         raise HTTPException(status_code=500, detail=f"토큰 발급 실패: {str(e)}")
         
@@ -144,7 +269,55 @@ async def get_stock_list():
         raise HTTPException(status_code=500, detail=f"종목 리스트 가져오기 실패: {str(e)}")
 
 
-# 개별 종목 시세 데이터 수집 함수 (멀티프로세싱용)
+# 시세 수집 최대 동시 요청 수 (공유 세션의 커넥션 풀 크기와 동일하게 유지)
+MAX_PRICE_WORKERS = KIS_CONCURRENCY
+
+# 완료된 종목 결과를 모아서 처리하고 작업 상태를 갱신하는 주기(초)
+PROGRESS_UPDATE_INTERVAL = 0.5
+
+# 워커 스레드별로 재사용하는 API 클라이언트와 에러 핸들러 (워커 초기화 시 생성)
+_worker_local = threading.local()
+
+# 모든 워커 스레드가 공유하는 토큰 매니저와 커넥션 풀 세션 (처음 필요할 때 생성)
+_shared_lock = threading.Lock()
+_shared_token_manager = None
+_shared_session = None
+
+
+def _get_shared_kis_resources():
+    """워커 스레드가 공유하는 한국투자증권 토큰 매니저와 세션 반환 (없으면 생성)"""
+    global _shared_token_manager, _shared_session
+    with _shared_lock:
+        if _shared_token_manager is None:
+            # 토큰 매니저 생성 - 실패 시 예외 발생
+            _shared_token_manager = KoreaInvestmentTokenManager(KIS_APP_KEY, KIS_APP_SECRET)
+        if _shared_session is None:
+            # 하나의 커넥션 풀에서 keep-alive 커넥션을 스레드 간에 재사용
+            _shared_session = create_session(pool_connections=1, pool_maxsize=MAX_PRICE_WORKERS)
+        return _shared_token_manager, _shared_session
+
+
+def _get_worker_client():
+    """현재 워커 스레드의 API 클라이언트와 에러 핸들러 반환 (없으면 생성)"""
+    client = getattr(_worker_local, 'client', None)
+    if client is None:
+        token_manager, session = _get_shared_kis_resources()
+        client = _worker_local.client = KoreaInvestmentAPIClient(token_manager, session=session)
+        _worker_local.error_handler = APIErrorHandler()
+    return client, _worker_local.error_handler
+
+
+def _init_price_worker():
+    """시세 수집 워커 스레드 초기화 (스레드당 한 번 API 클라이언트 생성)"""
+    try:
+        _get_worker_client()
+    except Exception as e:
+        # 초기화 함수에서 예외가 나면 스레드 풀 전체가 중단되므로,
+        # 여기서는 기록만 하고 첫 작업에서 다시 생성하며 오류를 전파
+        logger.error(f"워커 초기화 실패: {str(e)}")
+
+
+# 개별 종목 시세 데이터 수집 함수 (워커 스레드에서 실행)
 def collect_price_data(stock_data, start_date, end_date):
     """개별 종목의 시세 데이터 수집"""
     stock_code = stock_data.get('code')
@@ -154,14 +327,8 @@ def collect_price_data(stock_data, start_date, end_date):
         return None
     
     try:
-        # 토큰 매니저 생성
-        token_manager = KoreaInvestmentTokenManager(KIS_APP_KEY, KIS_APP_SECRET)
-        
-        # API 클라이언트 생성
-        client = KoreaInvestmentAPIClient(token_manager)
-        
-        # 에러 핸들러 생성
-        error_handler = APIErrorHandler()
+        # 워커 스레드에서 재사용하는 API 클라이언트와 에러 핸들러
+        client, error_handler = _get_worker_client()
         
         # 시세 정보 가져오기
         price_data = error_handler.handle_request(
@@ -177,77 +344,187 @@ def collect_price_data(stock_data, start_date, end_date):
         if 'error' in price_data:
             return None
             
-        # 결과 처리
-        result = []
+        # 결과 처리 (종목코드/종목명 컬럼은 파일에 쓸 때 종목 단위로 한 번에 추가)
         if 'output2' in price_data and isinstance(price_data['output2'], list):
-            # 각 항목에 종목코드와 종목명 추가
-            for item in price_data['output2']:
-                item['종목코드'] = stock_code
-                item['종목명'] = stock_name or ''
-            result = price_data['output2']
-            return result
+            return price_data['output2']
         else:
             return None
             
+    except (TokenFailedException, FatalTokenError):
+        # 토큰 오류는 수집 작업으로 전파하여 전체 작업을 중단
+        raise
     except Exception:
         return None
 
 
-# 시세 데이터 저장 함수
-def save_price_data_to_csv(price_data, filename):
-    """시세 데이터를 CSV 파일로 저장"""
-    if not price_data:
-        logger.error("저장할 시세 데이터가 없습니다.")
-        return False
-        
+# 시세 필드명 매핑 (영어 -> 한글)
+PRICE_FIELD_MAPPING = {
+    'stck_bsop_date': '날짜',
+    'stck_clpr': '종가',
+    'stck_oprc': '시가',
+    'stck_hgpr': '고가',
+    'stck_lwpr': '저가',
+    'acml_vol': '거래량',
+    'acml_tr_pbmn': '거래대금',
+    'flng_cls_code': '락구분',
+    'prtt_rate': '분할비율',
+    '종목코드': '종목코드',
+    '종목명': '종목명'
+}
+
+# 시세 파일 필드 순서
+PRICE_FIELD_ORDER = [
+    '종목코드', '종목명', '날짜', '시가', '고가', 
+    '저가', '종가', '거래량', '거래대금', '락구분', '분할비율'
+]
+
+# 한글 필드명 -> API 필드명
+_PRICE_SOURCE_FIELDS = {korean_key: eng_key for eng_key, korean_key in PRICE_FIELD_MAPPING.items()}
+
+# 종목 단위로 같은 값을 붙이는 필드 (필드 순서의 맨 앞)와 API 응답에서 읽는 나머지 필드
+_STOCK_FIELDS = ('종목코드', '종목명')
+_PRICE_VALUE_FIELDS = [korean_key for korean_key in PRICE_FIELD_ORDER if korean_key not in _STOCK_FIELDS]
+
+# 필드 순서대로 읽을 API 필드명과 한 번에 값을 꺼내는 getter
+_PRICE_SOURCE_KEYS = tuple(_PRICE_SOURCE_FIELDS[korean_key] for korean_key in _PRICE_VALUE_FIELDS)
+_get_price_values = itemgetter(*_PRICE_SOURCE_KEYS)
+
+# 시세 Parquet 스키마 (배치마다 같은 스키마로 이어 쓰기 위해 고정, API는 모든 값을 문자열로 반환)
+PRICE_PARQUET_SCHEMA = pa.schema([
+    (korean_key, pa.type_for_alias(PRICE_NUMERIC_TYPES.get(korean_key, 'string')))
+    for korean_key in PRICE_FIELD_ORDER
+]) if pa is not None else None
+
+
+def _price_values(price_data):
+    """API 시세 항목을 필드 순서의 값 목록으로 변환 (필드가 빠진 항목이 있으면 빈 값으로 채움)"""
     try:
-        # 디렉토리 생성
-        os.makedirs(os.path.dirname(filename), exist_ok=True)
-        
-        # 필드명 매핑 (영어 -> 한글)
-        field_mapping = {
-            'stck_bsop_date': '날짜',
-            'stck_clpr': '종가',
-            'stck_oprc': '시가',
-            'stck_hgpr': '고가',
-            'stck_lwpr': '저가',
-            'acml_vol': '거래량',
-            'acml_tr_pbmn': '거래대금',
-            'flng_cls_code': '락구분',
-            'prtt_rate': '분할비율',
-            '종목코드': '종목코드',
-            '종목명': '종목명'
-        }
-        
-        # 필드 순서 정의
-        field_order = [
-            '종목코드', '종목명', '날짜', '시가', '고가', 
-            '저가', '종가', '거래량', '거래대금', '락구분', '분할비율'
-        ]
-        
-        # CSV 파일로 저장
-        with open(filename, 'w', encoding='utf-8-sig', newline='') as f:
-            # 헤더 준비
-            writer = csv.DictWriter(f, fieldnames=field_order)
-            writer.writeheader()
-            
-            # 데이터 변환 및 저장
-            for item in price_data:
-                # 영어 필드명을 한글로 변환
-                korean_item = {}
-                for eng_key, value in item.items():
-                    if eng_key in field_mapping:
-                        korean_key = field_mapping[eng_key]
-                        korean_item[korean_key] = value
-                
-                # 변환된 데이터 쓰기
-                writer.writerow(korean_item)
+        return list(map(_get_price_values, price_data))
+    except KeyError:
+        return [tuple(item.get(key) for key in _PRICE_SOURCE_KEYS) for item in price_data]
+
+
+def _price_rows(price_data, stock_code, stock_name):
+    """종목 하나의 시세 항목을 CSV 행으로 변환 (종목코드/종목명을 행 앞에 붙임)"""
+    stock_values = (stock_code, stock_name or '')
+    return [stock_values + values for values in _price_values(price_data)]
+
+
+def _price_record_batch(price_data, stock_code, stock_name):
+    """종목 하나의 시세 데이터를 필드 순서대로 변환한 RecordBatch 생성 (빈 값은 null)"""
+    # 종목코드/종목명은 종목 단위 상수 컬럼으로 한 번에 생성
+    row_count = len(price_data)
+    arrays = [pa.array([stock_code] * row_count, pa.string()), pa.array([stock_name or ''] * row_count, pa.string())]
+    
+    # API 문자열 값은 문자열 배열로 만든 뒤 숫자 컬럼만 pyarrow에서 한 번에 형 변환
+    for korean_key, values in zip(_PRICE_VALUE_FIELDS, zip(*_price_values(price_data))):
+        array = pa.array(values, pa.string())
+        target_type = PRICE_PARQUET_SCHEMA.field(korean_key).type
+        if target_type != pa.string():
+            array = pc.if_else(pc.equal(array, ''), pa.scalar(None, pa.string()), array).cast(target_type)
+        arrays.append(array)
+    return pa.RecordBatch.from_arrays(arrays, schema=PRICE_PARQUET_SCHEMA)
+
+
+def open_price_parquet_writer(filename):
+    """시세 데이터를 종목 단위로 이어 쓰는 ParquetWriter 생성 (pyarrow 필요)"""
+    if pq is None:
+        raise RuntimeError("Parquet 저장에는 pyarrow가 필요합니다.")
+    
+    # 디렉토리 생성
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    return pq.ParquetWriter(filename, PRICE_PARQUET_SCHEMA, compression=PARQUET_COMPRESSION)
+
+
+def write_price_parquet_dataset(parquet_filename, base_dir):
+    """시세 Parquet 파일을 날짜별 Hive 파티션 데이터셋으로 저장 (날짜=YYYYMMDD/part-0.parquet)"""
+    import pyarrow.dataset as ds
+    
+    ds.write_dataset(
+        pq.read_table(parquet_filename),
+        base_dir=base_dir,
+        format="parquet",
+        file_options=ds.ParquetFileFormat().make_write_options(compression=PARQUET_COMPRESSION),
+        partitioning=ds.partitioning(pa.schema([("날짜", pa.string())]), flavor="hive"),
+        existing_data_behavior="overwrite_or_ignore"
+    )
+
+
+class PriceFileWriter:
+    """수집된 시세를 백그라운드 스레드에서 CSV 또는 Parquet 파일에 이어 쓰기"""
+    
+    # 쓰기 대기열 최대 길이 (종목 단위, 가득 차면 수집 쪽이 잠시 대기)
+    QUEUE_SIZE = 16
+    
+    def __init__(self, filename, file_format):
+        self.filename = filename
+        self.file_format = file_format
+        self.error = None
+        self._queue = queue.Queue(maxsize=self.QUEUE_SIZE)
+        
+        # 파일은 호출한 쪽에서 열어 pyarrow 미설치 등의 오류를 바로 전달
+        if file_format == 'parquet':
+            self._parquet_writer = open_price_parquet_writer(filename)
+            self._file = None
+        else:
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+            self._parquet_writer = None
+            self._file = open(filename, 'w', encoding='utf-8-sig', newline='')
+            self._buffer = io.StringIO()
+            self._csv_writer = csv.writer(self._buffer)
+            self._csv_writer.writerow(PRICE_FIELD_ORDER)
+        
+        self._thread = threading.Thread(target=self._run, name='price-file-writer', daemon=True)
+        self._thread.start()
+    
+    def put(self, price_data, stock_code, stock_name):
+        """종목 하나의 시세 데이터를 쓰기 대기열에 추가"""
+        self._queue.put((price_data, stock_code, stock_name))
+    
+    async def put_async(self, price_data, stock_code, stock_name):
+        """이벤트 루프를 막지 않고 쓰기 대기열에 추가 (대기열이 가득 찬 경우에만 스레드에서 대기)"""
+        try:
+            self._queue.put_nowait((price_data, stock_code, stock_name))
+        except queue.Full:
+            await asyncio.get_running_loop().run_in_executor(None, self.put, price_data, stock_code, stock_name)
+    
+    def close(self):
+        """남은 데이터를 모두 기록한 뒤 파일 닫기 (쓰기 오류는 error 속성에 저장)"""
+        self._queue.put(None)
+        self._thread.join()
+    
+    def _run(self):
+        """대기열의 시세 데이터를 순서대로 파일에 기록"""
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                if self.error is not None:
+                    # 쓰기 실패 이후에는 수집 쪽이 막히지 않도록 대기열만 비움
+                    continue
+                try:
+                    self._write(*item)
+                except Exception as e:
+                    logger.error(f"{self.file_format.upper()} 파일 쓰기 실패: {str(e)}")
+                    self.error = e
+        finally:
+            if self._parquet_writer is not None:
+                self._parquet_writer.close()
+            else:
+                self._file.close()
+    
+    def _write(self, price_data, stock_code, stock_name):
+        """종목 하나의 시세 데이터를 파일에 기록"""
+        if self._parquet_writer is not None:
+            self._parquet_writer.write_batch(_price_record_batch(price_data, stock_code, stock_name))
+            return
         
-        logger.info(f"시세 데이터 CSV 저장 완료: {filename} ({len(price_data)}개 항목)")
-        return True
-    except Exception as e:
-        logger.error(f"CSV 저장 실패: {str(e)}")
-        return False
+        # CSV는 메모리 버퍼에 변환한 뒤 한 번에 쓰기
+        self._csv_writer.writerows(_price_rows(price_data, stock_code, stock_name))
+        self._file.write(self._buffer.getvalue())
+        self._buffer.seek(0)
+        self._buffer.truncate()
 
 
 # 날짜 검증 함수
@@ -261,7 +538,7 @@ def validate_date(date_str):
 
 
 # 시세 데이터 수집 및 저장 작업 실행
-async def collect_stock_prices(task_id, start_date, end_date, max_stocks=None):
+async def collect_stock_prices(task_id, start_date, end_date, max_stocks=None, file_format='csv'):
     """시세 데이터 수집 및 저장 작업 실행"""
     try:
         # 작업 상태 초기화
@@ -271,7 +548,8 @@ async def collect_stock_prices(task_id, start_date, end_date, max_stocks=None):
             "progress": 0,
             "message": "종목 목록 가져오는 중...",
             "file_path": None,
-            "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "dataset_path": None,
+            "created_at": time.time(),  # epoch 초로 저장하고 조회 시 문자열로 변환
             "completed_at": None
         }
         
@@ -289,7 +567,7 @@ async def collect_stock_prices(task_id, start_date, end_date, max_stocks=None):
         active_tasks[task_id]["message"] = f"종목 목록 가져오기 완료: {len(stock_list)}개 종목"
         
         # 2. 한국투자증권에서 종목별 시세 가져오기
-        all_price_data = []
+        total_rows = 0
         success_count = 0
         fail_count = 0
         
@@ -300,93 +578,124 @@ async def collect_stock_prices(task_id, start_date, end_date, max_stocks=None):
         
         active_tasks[task_id]["message"] = f"시세 데이터 수집 시작... (총 {len(stock_list)}개 종목)"
         
-        # 병렬 처리 설정
-        max_workers = max(1, mp.cpu_count() - 1)  # CPU 코어 수 - 1 (최소 1)
-        logger.info(f"병렬 처리 사용: {max_workers}개 프로세스")
-        
-        # 작업 배치 구성 (API 제한 방지)
-        batch_size = 20  # 한 번에 처리할 작업 수
-        wait_time = 1.0  # 배치 간 대기 시간(초)
-        total_batches = (len(stock_list) + batch_size - 1) // batch_size
+        # 병렬 처리 설정 (네트워크 대기 위주 작업이므로 스레드 사용, 초당 호출 수는 클라이언트의 rate limiter가 제한)
+        max_workers = MAX_PRICE_WORKERS
+        logger.info(f"병렬 처리 사용: {max_workers}개 스레드")
         
         # 모든 종목에 대해 시세 정보 수집 (병렬 처리)
         start_time = time.time()
+        total_stocks = len(stock_list)
         completed = 0
         
-        # 배치 단위로 처리
-        for batch_idx in range(total_batches):
-            batch_start = batch_idx * batch_size
-            batch_end = min(batch_start + batch_size, len(stock_list))
-            current_batch = stock_list[batch_start:batch_end]
-            
-            # 병렬 처리 준비
-            collect_with_dates = partial(collect_price_data, start_date=start_date, end_date=end_date)
+        # 병렬 처리 준비
+        collect_with_dates = partial(collect_price_data, start_date=start_date, end_date=end_date)
+        
+        # 워커가 공유할 토큰 매니저를 미리 생성 (실패 시 종목마다 토큰 발급을 재시도하지 않고 작업 실패 처리)
+        _get_shared_kis_resources()
+        
+        # 결과 파일 경로 (단일 날짜인 경우 파일명에 표시)
+        if start_date == end_date:
+            date_suffix = f"{start_date}"
+        else:
+            date_suffix = f"{start_date}_to_{end_date}"
+        result_filename = f"{DATA_PATH}/stock_prices_{date_suffix}_{task_id[:8]}.{file_format}"
+        
+        # 종목별 결과는 메모리에 모으지 않고 백그라운드 스레드에서 바로 파일에 이어 씀
+        file_writer = PriceFileWriter(result_filename, file_format)
+        
+        # 요청은 스레드 풀에서 실행하고, 이벤트 루프는 완료를 기다리는 동안 다른 API 요청을 처리
+        executor = ThreadPoolExecutor(max_workers=max_workers, initializer=_init_price_worker)
+        futures = {}
+        try:
+            futures = {
+                asyncio.wrap_future(executor.submit(collect_with_dates, stock)): stock
+                for stock in stock_list
+            }
+            pending = set(futures)
             
-            # 병렬 실행
-            with ProcessPoolExecutor(max_workers=max_workers) as executor:
-                futures = {executor.submit(collect_with_dates, stock): stock for stock in current_batch}
+            while pending:
+                # 종목마다 깨어나지 않고 주기마다 그 사이 완료된 결과를 한꺼번에 처리
+                done, pending = await asyncio.wait(pending, timeout=PROGRESS_UPDATE_INTERVAL)
+                if not done:
+                    continue
                 
-                for future in as_completed(futures):
+                for future in done:
                     stock = futures[future]
                     try:
                         price_data = future.result()
                         if price_data:
-                            all_price_data.extend(price_data)
+                            await file_writer.put_async(price_data, stock.get('code'), stock.get('name'))
+                            total_rows += len(price_data)
                             success_count += 1
                         else:
                             fail_count += 1
+                    except (TokenFailedException, FatalTokenError):
+                        raise
                     except Exception as e:
                         logger.error(f"종목 {stock.get('code')} 데이터 수집 중 오류: {str(e)}")
                         fail_count += 1
                     
-                    # 진행 상황 업데이트
                     completed += 1
-                    elapsed = time.time() - start_time
-                    estimated_total = elapsed / completed * len(stock_list)
-                    estimated_remaining = estimated_total - elapsed
-                    
-                    # 작업 상태 업데이트
-                    progress = 10 + 80 * (completed / len(stock_list))  # 10%~90% 진행률
-                    active_tasks[task_id]["progress"] = progress
-                    active_tasks[task_id]["message"] = (
-                        f"시세 수집 중: {completed}/{len(stock_list)} 종목 완료 "
-                        f"(성공: {success_count}, 실패: {fail_count}), "
-                        f"남은 시간: {estimated_remaining/60:.1f}분"
-                    )
-            
-            # 배치 간 대기 (API 제한 방지)
-            if batch_idx < total_batches - 1:
-                await asyncio.sleep(wait_time)  # 배치 사이 대기
+                
+                # 진행 상황 업데이트
+                elapsed = time.time() - start_time
+                estimated_total = elapsed / completed * total_stocks
+                estimated_remaining = estimated_total - elapsed
+                
+                # 작업 상태 업데이트
+                progress = 10 + 80 * (completed / total_stocks)  # 10%~90% 진행률
+                active_tasks[task_id]["progress"] = progress
+                active_tasks[task_id]["message"] = (
+                    f"시세 수집 중: {completed}/{total_stocks} 종목 완료 "
+                    f"(성공: {success_count}, 실패: {fail_count}), "
+                    f"남은 시간: {estimated_remaining/60:.1f}분"
+                )
+        finally:
+            # 중단된 경우 아직 시작하지 않은 요청은 취소 (이벤트 루프를 막지 않도록 대기하지 않음)
+            # (asyncio 퓨처를 취소하면 감싼 스레드 풀 퓨처도 함께 취소됨, Python 3.8 호환)
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+            # 남은 쓰기가 끝날 때까지 이벤트 루프를 막지 않고 대기
+            await asyncio.get_running_loop().run_in_executor(None, file_writer.close)
         
         total_time = time.time() - start_time
-        logger.info(f"시세 데이터 수집 완료: 성공 {success_count}개, 실패 {fail_count}개, 총 {len(all_price_data)}개 데이터")
+        logger.info(f"시세 데이터 수집 완료: 성공 {success_count}개, 실패 {fail_count}개, 총 {total_rows}개 데이터")
         logger.info(f"총 소요 시간: {total_time/60:.1f}분 ({total_time:.1f}초)")
         
         # 작업 상태 업데이트
         active_tasks[task_id]["progress"] = 90
-        active_tasks[task_id]["message"] = f"데이터 수집 완료, CSV 파일 저장 중... ({len(all_price_data)}개 데이터)"
+        active_tasks[task_id]["message"] = f"데이터 수집 완료, {file_format.upper()} 파일 저장 중... ({total_rows}개 데이터)"
         
-        # 3. 수집된 모든 시세 데이터를 CSV 파일로 저장
-        if all_price_data:
-            # 단일 날짜인 경우 파일명에 표시
-            if start_date == end_date:
-                date_suffix = f"{start_date}"
-            else:
-                date_suffix = f"{start_date}_to_{end_date}"
+        # 3. 저장 결과 확인 (시세 데이터는 수집 중 이미 파일에 기록됨)
+        if total_rows:
+            if file_writer.error is None:
+                logger.info(f"시세 데이터 {file_format.upper()} 저장 완료: {result_filename} ({total_rows}개 항목)")
+                
+                # 날짜 범위 Parquet은 날짜별 파티션 데이터셋도 생성 (특정 날짜만 읽을 수 있도록)
+                if file_format == 'parquet' and start_date != end_date:
+                    dataset_dir = f"{DATA_PATH}/stock_prices/{task_id[:8]}"
+                    try:
+                        await asyncio.get_running_loop().run_in_executor(
+                            None, write_price_parquet_dataset, result_filename, dataset_dir
+                        )
+                        active_tasks[task_id]["dataset_path"] = dataset_dir
+                        logger.info(f"날짜별 Parquet 데이터셋 저장 완료: {dataset_dir}")
+                    except Exception as e:
+                        logger.warning(f"날짜별 Parquet 데이터셋 저장 실패: {str(e)}")
                 
-            csv_filename = f"{DATA_PATH}/stock_prices_{date_suffix}_{task_id[:8]}.csv"
-            save_result = save_price_data_to_csv(all_price_data, csv_filename)
-            
-            if save_result:
                 active_tasks[task_id]["status"] = "completed"
                 active_tasks[task_id]["progress"] = 100
                 active_tasks[task_id]["message"] = f"시세 데이터 수집 및 저장 완료"
-                active_tasks[task_id]["file_path"] = csv_filename
+                active_tasks[task_id]["file_path"] = result_filename
             else:
                 active_tasks[task_id]["status"] = "failed"
                 active_tasks[task_id]["progress"] = 90
-                active_tasks[task_id]["message"] = "CSV 파일 저장 실패"
+                active_tasks[task_id]["message"] = f"{file_format.upper()} 파일 저장 실패"
         else:
+            # 데이터 없이 생성된 빈 결과 파일 삭제
+            if os.path.exists(result_filename):
+                os.remove(result_filename)
             active_tasks[task_id]["status"] = "failed"
             active_tasks[task_id]["progress"] = 90
             active_tasks[task_id]["message"] = "저장할 시세 데이터가 없습니다."
@@ -430,7 +739,8 @@ async def collect_stock_prices_by_range(
         task_id,
         date_range.start_date,
         date_range.end_date,
-        date_range.max_stocks
+        date_range.max_stocks,
+        date_range.file_format
     )
     
     # 응답 반환
@@ -462,7 +772,8 @@ async def collect_stock_prices_by_date(
         task_id,
         single_date.date,
         single_date.date,
-        single_date.max_stocks
+        single_date.max_stocks,
+        single_date.file_format
     )
     
     # 응답 반환
@@ -481,14 +792,16 @@ async def get_task_status(task_id: str):
     if task_id not in active_tasks:
         raise HTTPException(status_code=404, detail=f"작업 ID {task_id}를 찾을 수 없습니다.")
     
-    return active_tasks[task_id]
+    task = active_tasks[task_id]
+    return {**task, "created_at": datetime.fromtimestamp(task["created_at"]).strftime("%Y-%m-%d %H:%M:%S")}
 
 
 # 오늘 날짜 데이터 수집 API (n8n에서 간편하게 사용 가능)
 @app.get("/api/stock-prices/today", response_model=TaskResponse)
 async def collect_stock_prices_today(
     background_tasks: BackgroundTasks,
-    max_stocks: Optional[int] = Query(None, description="최대 처리 종목 수 (기본값: 전체 종목)")
+    max_stocks: Optional[int] = Query(None, description="최대 처리 종목 수 (기본값: 전체 종목)"),
+    file_format: FileFormat = Query('csv', description="결과 파일 형식 (csv 또는 parquet)")
 ):
     """오늘 날짜의 모든 종목 시세 데이터를 수집하는 API"""
     # 오늘 날짜 설정
@@ -503,7 +816,8 @@ async def collect_stock_prices_today(
         task_id,
         today,
         today,
-        max_stocks
+        max_stocks,
+        file_format
     )
     
     # 응답 반환
@@ -534,7 +848,7 @@ async def download_result_file(task_id: str):
     return FileResponse(
         path=file_path,
         filename=os.path.basename(file_path),
-        media_type="text/csv"
+        media_type="application/vnd.apache.parquet" if file_path.endswith('.parquet') else "text/csv"
     )
 
 
@@ -548,4 +862,4 @@ async def root():
 # FASTAPI 서버 실행 코드
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("main_api:app", host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
+    uvicorn.run("main_api:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
@@ -0,0 +1,52 @@
+import pytest
+
+pytest.importorskip("pandas")
+pytest.importorskip("loguru")
+pytest.importorskip("requests")
+pytest.importorskip("dotenv")
+
+from collectors.price_data_collector import PriceDataCollector
+
+
+def _make_collector():
+    """파일 시스템에 접근하지 않는 수집기 생성 (standardize_data 테스트용)"""
+    collector = PriceDataCollector.__new__(PriceDataCollector)
+    collector.api_client = None
+    collector.stock_names = {}
+    collector._placeholder_names = {}
+    return collector
+
+
+def _item(date, close='1000', **overrides):
+    item = {
+        'stck_bsop_date': date,
+        'stck_oprc': '990',
+        'stck_hgpr': '1010',
+        'stck_lwpr': '980',
+        'stck_clpr': close,
+        'acml_vol': '12345',
+        'acml_tr_pbmn': '12345000',
+        'prdy_ctrt': '0.50',
+        'prtt_rate': '1.00',
+    }
+    item.update(overrides)
+    return item
+
+
+def test_standardize_data_skips_malformed_rows():
+    raw_data = {'output2': [
+        _item('20240103'),
+        _item('20240102', close='N/A'),
+        _item('20240104', acml_vol=None),
+        _item('20240101', acml_tr_pbmn='', prdy_ctrt=''),
+    ]}
+    
+    result = _make_collector().standardize_data(raw_data, '005930', stock_name='삼성전자')
+    
+    # 종가/거래량을 변환할 수 없는 행은 0으로 채우지 않고 제외
+    assert [row['거래일'] for row in result] == ['20240101', '20240103']
+    assert all(row['종가'] == 1000 and row['거래량'] == 12345 for row in result)
+    
+    # 거래대금/등락률의 빈 값은 0으로 처리
+    assert result[0]['거래대금'] == 0
+    assert result[0]['등락률'] == 0.0
@@ -1,15 +1,19 @@
+import asyncio
+import functools
+import random
 import time
-import sys
 from loguru import logger
-from api.token_manager import TokenFailedException
+from api.token_manager import TokenExpiredException, TokenFailedException
+from api.base_client import FatalTokenError
 
 
 class APIErrorHandler:
     """API 요청 에러 처리 및 재시도 클래스"""
     
-    def __init__(self, max_retries=3, retry_delay=5):
+    def __init__(self, max_retries=3, retry_delay=5, max_delay=60):
         self.max_retries = max_retries
         self.retry_delay = retry_delay
+        self.max_delay = max_delay  # 재시도 대기 시간 상한 (초)
     
     def handle_request(self, request_func, *args, **kwargs):
         """재시도 메커니즘을 통한 API 요청 처리"""
@@ -19,37 +23,99 @@ class APIErrorHandler:
         while retries < self.max_retries:
             try:
                 return request_func(*args, **kwargs)
-            except TokenFailedException as e:
-                # 토큰 발급 실패는 재시도하지 않고 즉시 종료
-                logger.critical(f"토큰 발급 실패: {str(e)}")
-                sys.exit(1)  # 프로그램 종료
             except Exception as e:
                 last_error = e
                 retries += 1
                 
-                if '토큰' in str(e).lower() or 'token' in str(e).lower():
-                    logger.warning(f"토큰 관련 오류 발생: {str(e)}")
-                    # 토큰 갱신은 TokenManager에서 자동 처리됨
-                elif isinstance(e, ConnectionError):
-                    logger.warning(f"연결 오류 발생 ({retries}/{self.max_retries}): {str(e)}")
-                else:
-                    logger.error(f"API 요청 오류 ({retries}/{self.max_retries}): {str(e)}")
-                
                 # 마지막 시도가 아니면 대기 후 재시도
-                if retries < self.max_retries:
-                    wait_time = self.retry_delay * retries
-                    logger.info(f"{wait_time}초 후 재시도합니다...")
+                wait_time = self._retry_wait(e, retries)
+                if wait_time is not None:
                     time.sleep(wait_time)
         
+        self._raise_max_retries(last_error)
+    
+    async def handle_request_async(self, request_func, *args, **kwargs):
+        """handle_request의 비동기 버전 (요청은 스레드에서 실행하고, 재시도 대기 중에도 이벤트 루프를 막지 않음)"""
+        loop = asyncio.get_running_loop()
+        call = functools.partial(request_func, *args, **kwargs)
+        retries = 0
+        last_error = None
+        
+        while retries < self.max_retries:
+            try:
+                return await loop.run_in_executor(None, call)
+            except Exception as e:
+                last_error = e
+                retries += 1
+                
+                # 마지막 시도가 아니면 대기 후 재시도
+                wait_time = self._retry_wait(e, retries)
+                if wait_time is not None:
+                    await asyncio.sleep(wait_time)
+        
+        self._raise_max_retries(last_error)
+    
+    def _retry_wait(self, error, retries):
+        """요청 오류를 처리하고 재시도 전 대기 시간 반환 (마지막 시도면 None)"""
+        # 예외 클래스(상위 클래스 포함)로 처리 방식 선택 (등록되지 않은 예외는 일반 오류로 처리)
+        for error_type in type(error).__mro__:
+            policy = _ERROR_POLICIES.get(error_type)
+            if policy is not None:
+                break
+        else:
+            policy = _log_request_error
+        policy(self, error, retries)
+        
+        if retries >= self.max_retries:
+            return None
+        
+        # 지수 백오프 (상한 적용) + jitter로 여러 워커의 재시도 시점이 겹치지 않도록 분산
+        wait_time = min(self.max_delay, self.retry_delay * (2 ** (retries - 1))) * random.uniform(0.5, 1.5)
+        logger.info(f"{wait_time:.1f}초 후 재시도합니다...")
+        return wait_time
+    
+    def _raise_max_retries(self, last_error):
+        """최대 재시도 횟수 초과 예외 발생"""
         logger.error(f"최대 재시도 횟수 초과: {self.max_retries}")
         raise MaxRetriesExceededException(f"최대 재시도 횟수({self.max_retries})를 초과했습니다: {str(last_error)}")
 
 
-class TokenExpiredException(Exception):
-    """토큰 만료 예외"""
+class MaxRetriesExceededException(Exception):
+    """최대 재시도 초과 예외"""
     pass
 
 
-class MaxRetriesExceededException(Exception):
-    """최대 재시도 초과 예외"""
-    pass
\ No newline at end of file
+def _raise_token_failure(handler, error, retries):
+    """토큰 발급 실패는 재시도하지 않고 호출자에게 전파 (종료 여부는 CLI에서 결정)"""
+    logger.critical(f"토큰 발급 실패: {str(error)}")
+    raise error
+
+
+def _raise_fatal(handler, error, retries):
+    """재시도해도 복구되지 않으므로 즉시 호출자에게 전파"""
+    raise error
+
+
+def _log_token_error(handler, error, retries):
+    """토큰 관련 오류 기록 (토큰 갱신은 TokenManager에서 자동 처리됨)"""
+    logger.warning(f"토큰 관련 오류 발생: {str(error)}")
+
+
+def _log_connection_error(handler, error, retries):
+    """연결/시간 초과 오류 기록"""
+    logger.warning(f"연결 오류 발생 ({retries}/{handler.max_retries}): {str(error)}")
+
+
+def _log_request_error(handler, error, retries):
+    """그 밖의 API 요청 오류 기록"""
+    logger.error(f"API 요청 오류 ({retries}/{handler.max_retries}): {str(error)}")
+
+
+# 예외 클래스별 처리 방식 (재시도 여부와 로그 수준)
+_ERROR_POLICIES = {
+    TokenFailedException: _raise_token_failure,
+    FatalTokenError: _raise_fatal,
+    TokenExpiredException: _log_token_error,
+    ConnectionError: _log_connection_error,
+    TimeoutError: _log_connection_error,
+}
\ No newline at end of file
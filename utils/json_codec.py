@@ -0,0 +1,26 @@
+import json
+
+try:
+    import orjson
+except ImportError:  # orjson 미설치 환경에서는 표준 json 모듈 사용
+    orjson = None
+
+
+# orjson.JSONDecodeError는 json.JSONDecodeError의 하위 클래스이므로 동일하게 처리 가능
+JSONDecodeError = json.JSONDecodeError
+
+
+def loads(data):
+    """JSON 문자열/바이트를 파이썬 객체로 변환"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj, indent=False):
+    """파이썬 객체를 JSON 바이트(UTF-8)로 변환 (indent=True이면 2칸 들여쓰기)"""
+    if orjson is not None:
+        if indent:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None).encode('utf-8')
\ No newline at end of file
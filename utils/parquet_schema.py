@@ -0,0 +1,23 @@
+# 시세 Parquet 파일 공통 저장 형식 (API 서버와 수집기가 같은 스키마/압축 방식으로 저장)
+
+# Parquet 압축 코덱
+PARQUET_COMPRESSION = 'snappy'
+
+# 숫자형으로 저장할 시세 필드와 타입 (pyarrow 타입 별칭, 나머지 필드는 문자열)
+PRICE_NUMERIC_TYPES = {
+    '시가': 'int64',
+    '고가': 'int64',
+    '저가': 'int64',
+    '종가': 'int64',
+    '거래량': 'int64',
+    '거래대금': 'int64',
+    '등락률': 'float64',
+    '회전율': 'float64',
+    '분할비율': 'float64',
+}
+
+# pandas 저장 시 사용할 nullable 타입 (결측값이 있어도 형 변환이 실패하지 않도록 함)
+PRICE_PANDAS_DTYPES = {
+    field: {'int64': 'Int64', 'float64': 'Float64'}[dtype]
+    for field, dtype in PRICE_NUMERIC_TYPES.items()
+}
@@ -0,0 +1,21 @@
+import threading
+import time
+from collections import deque
+
+
+class RateLimiter:
+    """초당 요청 수 제한 클래스 (최근 1초 구간의 요청 시각 기준)"""
+    
+    def __init__(self, rps):
+        self.rps = max(1, int(rps))
+        self.times = deque(maxlen=self.rps)
+        self._lock = threading.Lock()
+    
+    def wait(self):
+        """요청 한도에 도달한 경우에만 남은 시간만큼 대기"""
+        with self._lock:
+            if len(self.times) == self.rps:
+                delay = 1.0 - (time.monotonic() - self.times[0])
+                if delay > 0:
+                    time.sleep(delay)
+            self.times.append(time.monotonic())
\ No newline at end of file